@@ -1,9 +1,10 @@
 from fastapi import Header, HTTPException, Depends, status
 from utils_types.user_info_in_token import UserInfoInToken
 from utils.token_utils import TokenUtils
+from utils.user_cache import UserCache
 from typing import Annotated
 
-def get_user(authorization: str = Header(None, alias='Authorization')) -> UserInfoInToken:
+async def get_user(authorization: str = Header(None, alias='Authorization')) -> UserInfoInToken:
     if authorization is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -18,7 +19,7 @@ def get_user(authorization: str = Header(None, alias='Authorization')) -> UserIn
                 detail='Authorization scheme must be Bearer'
             )
         
-        return TokenUtils.decode_access_token(token=token)
+        user_info = TokenUtils.decode_access_token(token=token)
     
     except Exception:
         raise HTTPException(
@@ -26,5 +27,10 @@ def get_user(authorization: str = Header(None, alias='Authorization')) -> UserIn
             detail='Invalid or malformed token'
         )
 
+    # Resolved once here so that the services don't fetch the user again
+    user_info.user = await UserCache.get_active_user(user_info.id)
+
+    return user_info
+
     
 user_info_dependency = Annotated[UserInfoInToken, Depends(get_user)]
\ No newline at end of file
@@ -14,4 +14,7 @@ class LoginUserRequestDto(BaseModel):
 
 class UpdateUserRequestDto(BaseModel):
     fullname: Optional[str] = Field(min_length=5, max_length=30, default=None)
-    address: Optional[AddressDto] = None
\ No newline at end of file
+    address: Optional[AddressDto] = None
+
+class RefreshTokenRequestDto(BaseModel):
+    refresh_token: str
\ No newline at end of file
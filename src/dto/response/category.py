@@ -2,6 +2,8 @@ from pydantic import BaseModel
 from typing import Optional, Union
 from models.category import Category
 
+CATEGORY_RESPONSE_FIELDS = ['name', 'description', 'created_at', 'updated_at', 'deleted_at']
+
 class CategoryResponseModel(BaseModel):
     id: str
     name: str 
@@ -27,5 +29,5 @@ class CategoryResponseParser:
 
     @staticmethod
     def parse_list(categories: list[Union[Category, dict]], private: bool = False) -> list[CategoryResponseModel]:
-        return [CategoryResponseParser.parse(category, private) for category in categories]
+        return [CategoryResponseParser.parse(category) for category in categories]
 
@@ -9,6 +9,8 @@ from models.order import Order
 from typing import Union
 from enums.order_status_enum import EnumOrderStatus
 
+ORDER_RESPONSE_FIELDS = ['client', 'total', 'status', 'products', 'created_at']
+
 class OrderResponseModel(BaseModel):
     id: str
     client: UserResponseModel
@@ -30,8 +32,7 @@ class OrderResponseParser:
 
             client=UserResponseParser.parse(data.get("client")) if is_dict
                    else UserResponseParser.parse(order.client),
-            products= [OrderedProductResponseParser.parse(product) for product in data.get("products")] if is_dict
-                     else [OrderedProductResponseParser.parse(product) for product in order.products],
+            products=[OrderedProductResponseParser.parse(product) for product in data.get("products")],
 
             url=url if url else None,
 
@@ -49,13 +50,15 @@ class OrderResponseParser:
         orders: list[Union[Order, dict]],
         limit: int,
         page: int,
-        total_items: int,
-        total_pages: int
+        total_items: Optional[int],
+        total_pages: Optional[int],
+        next_cursor: Optional[str] = None
     ) -> Paginated[OrderResponseModel]:
         return Paginated[OrderResponseModel](
             items=OrderResponseParser.parse_list(orders),
             limit=limit,
             page=page,
             total_items=total_items,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=next_cursor
         )
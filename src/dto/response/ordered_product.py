@@ -1,21 +1,30 @@
 from pydantic import BaseModel
-from typing import Union
-from dto.response.product import ProductResponseModel, ProductResponseParser
+from typing import Optional, Union
 from models.ordered_product import OrderedProduct 
 
 class OrderedProductResponseModel(BaseModel):
-    product: ProductResponseModel 
+    product_id: str
+    name: Optional[str] = None
+    seller_id: Optional[str] = None
+    seller_name: Optional[str] = None
+    category_id: Optional[str] = None
+    category_name: Optional[str] = None
     price_at_order: float
     quantity: int
 
 class OrderedProductResponseParser:
     @staticmethod
     def parse(ordered_product: Union[OrderedProduct, dict]) -> OrderedProductResponseModel:
-        is_dict = isinstance(ordered_product, dict)
-        data = ordered_product if is_dict else ordered_product.to_mongo().to_dict()
+        # Rendered from the snapshot stored in the order, the product is never loaded
+        data = ordered_product if isinstance(ordered_product, dict) else ordered_product.to_mongo().to_dict()
         
         return OrderedProductResponseModel(
-            product=ProductResponseParser.parse(data.get("product")) if is_dict else ProductResponseParser.parse(ordered_product.product),
+            product_id=str(data.get("product")),
+            name=data.get("name"),
+            seller_id=str(data.get("seller_id")) if data.get("seller_id") else None,
+            seller_name=data.get("seller_name"),
+            category_id=str(data.get("category_id")) if data.get("category_id") else None,
+            category_name=data.get("category_name"),
             price_at_order=data.get("price_at_order"),
             quantity=data.get("quantity"),
         )
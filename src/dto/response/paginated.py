@@ -1,11 +1,13 @@
 from pydantic import BaseModel
-from typing import TypeVar, Generic
+from typing import Optional, TypeVar, Generic
 
 T = TypeVar("T")
 
 class Paginated(BaseModel, Generic[T]):
     items: list[T]
-    total_items: int 
-    total_pages: int
+    total_items: Optional[int] = None
+    total_pages: Optional[int] = None
     page: int
     limit: int
+    total_is_estimated: bool = False
+    next_cursor: Optional[str] = None
@@ -7,6 +7,8 @@ from typing import Optional
 from models.product import Product
 from typing import Union
 
+PRODUCT_RESPONSE_FIELDS = ['name', 'description', 'price', 'quantity', 'picture', 'seller', 'category', 'created_at', 'updated_at', 'deleted_at']
+
 class ProductResponseModel(BaseModel):
     id: str
     name: str 
@@ -53,13 +55,17 @@ class ProductResponseParser:
         products: list[Union[Product, dict]],
         limit: int,
         page: int,
-        total_items: int,
-        total_pages: int
+        total_items: Optional[int],
+        total_pages: Optional[int],
+        total_is_estimated: bool = False,
+        next_cursor: Optional[str] = None
     ) -> Paginated[ProductResponseModel]:
         return Paginated[ProductResponseModel](
             items=ProductResponseParser.parse_list(products),
             limit=limit,
             page=page,
             total_items=total_items,
-            total_pages=total_pages
+            total_pages=total_pages,
+            total_is_estimated=total_is_estimated,
+            next_cursor=next_cursor
         )
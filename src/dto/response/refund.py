@@ -11,6 +11,8 @@ from models.refund import Refund
 from typing import Union
 from enums.order_status_enum import EnumOrderStatus
 
+REFUND_RESPONSE_FIELDS = ['status', 'original_amount', 'refunded_amount', 'refund_id', 'client', 'order', 'created_at']
+
 class RefundResponseModel(BaseModel):
     id: str
     status: EnumRefundStatus
@@ -53,13 +55,15 @@ class RefundResponseParser:
         refunds: list[Union[Refund, dict]],
         limit: int,
         page: int,
-        total_items: int,
-        total_pages: int
+        total_items: Optional[int],
+        total_pages: Optional[int],
+        next_cursor: Optional[str] = None
     ) -> Paginated[RefundResponseModel]:
         return Paginated[RefundResponseModel](
             items=RefundResponseParser.parse_list(refunds),
             limit=limit,
             page=page,
             total_items=total_items,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=next_cursor
         )
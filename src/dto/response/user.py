@@ -5,6 +5,9 @@ from .address import AddressResponseModel, AddressResponseParser
 from typing import Optional, Union
 from models.user import User
 
+# The fields read from the database to build a UserResponseModel, the password is never loaded
+USER_RESPONSE_FIELDS = ['fullname', 'email', 'address', 'role', 'created_at', 'updated_at', 'deleted_at']
+
 class UserResponseModel(BaseModel):
     id: str
     fullname: str 
@@ -45,21 +48,23 @@ class UserResponseParser:
         users: list[Union[User, dict]],
         limit: int,
         page: int,
-        total_items: int,
-        total_pages: int
+        total_items: Optional[int],
+        total_pages: Optional[int],
+        next_cursor: Optional[str] = None
     ) -> Paginated[list[UserResponseModel]]:
         return Paginated[UserResponseModel](
             items=UserResponseParser.parse_list(users),
             limit=limit,
             page=page,
             total_items=total_items,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=next_cursor
         )
     
-    def parse_logged_in_user(user: User, access_token: str, refresh_token: str = None) -> LoginResponseModel:
+    def parse_logged_in_user(user: User, access_token: str, refresh_token: str) -> LoginResponseModel:
         return LoginResponseModel(
             user = UserResponseParser.parse(user),
             access_token =  access_token, 
-            refresh_token = refresh_token if refresh_token else 'Coming soon'
+            refresh_token = refresh_token
         )
 
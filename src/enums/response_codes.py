@@ -36,4 +36,9 @@ class EnumResponseStatusCode(Enum):
     CANNOT_CANCEL_AFTER_TIMEOUT = 'CANNOT_CANCEL_AFTER_TIMEOUT'
     CAN_ONLY_ORDER_WITH_PAYMENT_ERROR='CAN_ONLY_ORDER_WITH_PAYMENT_ERROR'
     CAN_ONLY_RETRY_FAILED_REFUNDS = 'CAN_ONLY_RETRY_FAILED_REFUNDS'
-    REFUND_INITIATED= 'REFUND_INITIATED'
\ No newline at end of file
+    REFUND_INITIATED= 'REFUND_INITIATED'
+    ORDER_STATUS_CHANGED = 'ORDER_STATUS_CHANGED'
+    INVALID_CURSOR = 'INVALID_CURSOR'
+    TOO_MANY_REQUESTS = 'TOO_MANY_REQUESTS'
+    INVALID_REFRESH_TOKEN = 'INVALID_REFRESH_TOKEN'
+    LOGGED_OUT_SUCCESSFULLY = 'LOGGED_OUT_SUCCESSFULLY'
\ No newline at end of file
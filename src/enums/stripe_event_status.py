@@ -0,0 +1,8 @@
+from enum import Enum
+
+class EnumStripeEventStatus(Enum):
+    PENDING = 'PENDING'
+    PROCESSING = 'PROCESSING'
+    PROCESSED = 'PROCESSED'
+    FAILED = 'FAILED'
+    DEAD_LETTER = 'DEAD_LETTER'
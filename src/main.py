@@ -1,6 +1,10 @@
 from fastapi import FastAPI
 from mongoengine import connect, disconnect
 import scheduler
+from tasks.ensure_indexes import ensure_indexes
+from tasks.stripe_event_consumer import stripe_event_consumer
+from utils.category_cache import CategoryCache
+from services.stripe import StripeService
 from settings import Settings
 from utils.config import database_name, database_host
 from routers import auth, admin, category, product, order, webhook
@@ -16,16 +20,31 @@ app.include_router(order.router)
 app.include_router(webhook.router)
 
 async def startup_event():
+    connect(db=database_name, host=database_host)
+    print('Assoh service connected to DB.')
+
+    # The scheduler lock and the Stripe event deduplication rely on unique indexes, a failure stops the startup
+    await ensure_indexes()
+    print('Indexes ensured')
+
+    # Only warms the cache up, it is loaded again on its first read
     try:
-        connect(db=database_name, host=database_host)
-        print('Assoh service connected to DB.')
-        scheduler.start_scheduler()
-        print('Scheduler started')
+        await CategoryCache.refresh()
+        print('Categories cached')
     except Exception as e:
-        print(f"Failed to start scheduler: {e}")
+        print(f"Failed to cache categories: {e}")
+
+    # Without them orders never expire and paid orders are never confirmed, a failure stops the startup
+    scheduler.start_scheduler()
+    print('Scheduler started')
+    stripe_event_consumer.start()
+    print('Stripe event consumer started')
 
 async def shutdown_event():
     try:
+        await stripe_event_consumer.stop()
+        print('Stripe event consumer stopped')
+        await StripeService.close()
         disconnect()
         print('Assoh service disconnected to DB.')
         scheduler.scheduler.shutdown()
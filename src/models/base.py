@@ -2,9 +2,10 @@ from mongoengine import Document, DateTimeField, BooleanField
 from datetime import datetime
 
 class BaseModel(Document):
-    meta = {'abstract': True}  
+    # Indexes are created by tasks.ensure_indexes at startup, not lazily on the first query
+    meta = {'abstract': True, 'auto_create_index': False}
 
-    created_at = DateTimeField(required=True, default=datetime.utcnow())
+    created_at = DateTimeField(required=True, default=datetime.utcnow)
     # created_by = ReferenceField()
     updated_at = DateTimeField()
     # updated_by = ReferenceField()
@@ -2,5 +2,11 @@ from mongoengine import StringField
 from .base import BaseModel
 
 class Category(BaseModel):
+    meta = {
+        'indexes': [
+            'deleted',
+        ]
+    }
+
     name = StringField(required=True, unique=True)
     description = StringField(required=False)
\ No newline at end of file
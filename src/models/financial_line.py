@@ -7,6 +7,13 @@ from .user import User
 from .product import Product
 
 class FinancialLine(BaseModel):
+    meta = {
+        'indexes': [
+            'order',
+            'seller',
+        ]
+    }
+
     seller = ReferenceField(User, required=True)
     product = ReferenceField(Product, required=True)
     status = StringField(choices=[e.value for e in EnumFinancialLineStatus], required=True, default=EnumFinancialLineStatus.PENDING.value)
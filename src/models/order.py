@@ -5,9 +5,19 @@ from .user import User
 from .ordered_product import OrderedProduct
 
 class Order(BaseModel):
+    meta = {
+        'indexes': [
+            ('client', 'deleted', 'status'),
+            ('client', 'deleted', '-created_at', '-id'),
+            ('status', 'created_at'),
+            ('status', 'expires_at'),
+        ]
+    }
+
     products = ListField(EmbeddedDocumentField(OrderedProduct, required=True))
     client = ReferenceField(User, required=True)
     status = StringField(choices=[e.value for e in EnumOrderStatus], required=True, default=EnumOrderStatus.PENDING.value)
     total = FloatField(required=True)
     payment_intent_id = StringField(required=False)
     paid_at = DateTimeField(required=False)
+    expires_at = DateTimeField(required=False) # Cancelled automatically past this date if still unpaid
@@ -1,7 +1,16 @@
-from mongoengine import EmbeddedDocument, ReferenceField, FloatField, IntField
+from mongoengine import EmbeddedDocument, ReferenceField, FloatField, IntField, StringField, ObjectIdField
 from .product import Product
 
 class OrderedProduct(EmbeddedDocument):
     product = ReferenceField(Product, required=True)
     price_at_order = FloatField(required=True)
-    quantity = IntField(required=True)
\ No newline at end of file
+    quantity = IntField(required=True)
+
+    # Snapshot taken when the order is created, orders are displayed from it without joins
+    # and don't change when the product is renamed. Missing on orders that were not backfilled yet.
+    name = StringField(required=False)
+    description = StringField(required=False)
+    seller_id = ObjectIdField(required=False)
+    seller_name = StringField(required=False)
+    category_id = ObjectIdField(required=False)
+    category_name = StringField(required=False)
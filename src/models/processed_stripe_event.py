@@ -0,0 +1,7 @@
+from mongoengine import StringField
+from .base import BaseModel
+
+# Written in the same transaction as the effects of the event, so an event can only be applied once
+class ProcessedStripeEvent(BaseModel):
+    event_id = StringField(required=True, unique=True)
+    type = StringField(required=True)
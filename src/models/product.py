@@ -4,6 +4,20 @@ from .user import User
 from .category import Category
 
 class Product(BaseModel):
+    meta = {
+        'indexes': [
+            ('deleted', '-created_at', '-id'),
+            ('deleted', 'category', 'price'),
+            ('deleted', 'category', '-created_at', '-id'),
+            ('deleted', 'seller', '-created_at', '-id'),
+            {
+                'fields': ['$name', '$description'],
+                'weights': {'name': 10, 'description': 2},
+                'default_language': 'english'
+            },
+        ]
+    }
+
     name = StringField(required=True)
     description = StringField(required=True)
     price = FloatField(required=True)
@@ -0,0 +1,18 @@
+from mongoengine import StringField, ReferenceField, DateTimeField, BooleanField
+from .base import BaseModel
+from .user import User
+
+class RefreshToken(BaseModel):
+    meta = {
+        'indexes': [
+            'family',
+            # Mongo removes the expired tokens by itself
+            {'fields': ['expires_at'], 'expireAfterSeconds': 0},
+        ]
+    }
+
+    user = ReferenceField(User, required=True)
+    token_hash = StringField(required=True, unique=True) # Only the SHA-256 of the token is stored
+    family = StringField(required=True) # Shared by all the tokens obtained by rotating the same login
+    expires_at = DateTimeField(required=True)
+    revoked = BooleanField(default=False, required=True)
@@ -5,6 +5,14 @@ from .base import BaseModel
 from .user import User
 
 class Refund(BaseModel):
+    meta = {
+        'indexes': [
+            'order',
+            ('status', '-created_at', '-id'),
+            ('client', 'deleted', '-created_at', '-id'),
+        ]
+    }
+
     client = ReferenceField(User, required=True)
     status = StringField(choices=[e.value for e in EnumRefundStatus], required=True, default=EnumRefundStatus.CREATED.value)
     order = ReferenceField(Order, required=True)
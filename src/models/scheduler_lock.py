@@ -0,0 +1,14 @@
+from mongoengine import StringField, DateTimeField
+from .base import BaseModel
+
+class SchedulerLock(BaseModel):
+    meta = {
+        'indexes': [
+            # Mongo removes a lease that was not released, acquire doesn't wait for it
+            {'fields': ['expires_at'], 'expireAfterSeconds': 0},
+        ]
+    }
+
+    name = StringField(required=True, unique=True) # One lock per scheduled job
+    owner = StringField(required=True) # The process holding the lease
+    expires_at = DateTimeField(required=True)
@@ -0,0 +1,21 @@
+from mongoengine import StringField, IntField, DateTimeField
+from enums.stripe_event_status import EnumStripeEventStatus
+from .base import BaseModel
+
+class StripeEvent(BaseModel):
+    meta = {
+        'indexes': [
+            # Used by the consumer to claim the next event that is due
+            ('status', 'next_attempt_at'),
+            ('status', 'locked_at'),
+        ]
+    }
+
+    event_id = StringField(required=True, unique=True) # Stripe delivers the same event more than once
+    type = StringField(required=True)
+    payload = StringField(required=True) # The data object of the event as sent by Stripe, in JSON
+    status = StringField(choices=[e.value for e in EnumStripeEventStatus], required=True, default=EnumStripeEventStatus.PENDING.value)
+    attempts = IntField(required=True, default=0)
+    next_attempt_at = DateTimeField(required=True)
+    locked_at = DateTimeField()
+    last_error = StringField()
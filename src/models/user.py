@@ -3,6 +3,12 @@ from .base import BaseModel
 from enums.user_role_enum import EnumUserRole
 from .address import Address
 class User(BaseModel):
+    meta = {
+        'indexes': [
+            ('deleted', '-created_at', '-id'),
+        ]
+    }
+
     fullname = StringField(required=True)
     email = EmailField(required=True, unique=True)
     password = StringField(required=True)
@@ -0,0 +1,160 @@
+from typing import Any, Callable, Generic, Optional, TypeVar
+from mongoengine import Document, get_db
+from pymongo.client_session import ClientSession
+from pymongo.collection import Collection
+from starlette.concurrency import run_in_threadpool
+
+T = TypeVar("T", bound=Document)
+R = TypeVar("R")
+
+# Every mongoengine call is blocking, so the repositories push them to the
+# threadpool and the services only ever await them from the event loop.
+class BaseRepository(Generic[T]):
+    model: type[T]
+
+    @classmethod
+    async def find_one(cls, *args, **filters) -> Optional[T]:
+        return await run_in_threadpool(lambda: cls.model.objects(*args, **filters).first())
+
+    @classmethod
+    async def find(
+        cls,
+        *args,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+        order_by: Optional[list[str]] = None,
+        **filters
+    ) -> list[T]:
+        def query() -> list[T]:
+            queryset = cls.model.objects(*args, **filters)
+            if order_by:
+                queryset = queryset.order_by(*order_by)
+            if skip:
+                queryset = queryset.skip(skip)
+            if limit:
+                queryset = queryset.limit(limit)
+            return list(queryset)
+
+        return await run_in_threadpool(query)
+
+    @classmethod
+    async def find_raw(
+        cls,
+        *args,
+        fields: list[str],
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+        order_by: Optional[list[str]] = None,
+        **filters
+    ) -> list[dict]:
+        """Same as find, but only loads these fields and returns the raw documents."""
+        def query() -> list[dict]:
+            queryset = cls.model.objects(*args, **filters).only(*fields)
+            if order_by:
+                queryset = queryset.order_by(*order_by)
+            if skip:
+                queryset = queryset.skip(skip)
+            if limit:
+                queryset = queryset.limit(limit)
+            return list(queryset.as_pymongo())
+
+        return await run_in_threadpool(query)
+
+    @classmethod
+    async def count(cls, *args, **filters) -> int:
+        return await run_in_threadpool(lambda: cls.model.objects(*args, **filters).count())
+
+    @classmethod
+    async def count_raw(cls, query: dict, limit: Optional[int] = None) -> int:
+        """Counts the documents matching a raw query, stops counting at limit when it is given."""
+        options = {"limit": limit} if limit else {}
+        return await run_in_threadpool(lambda: cls.collection().count_documents(query, **options))
+
+    @classmethod
+    async def aggregate(cls, pipeline: list[dict]) -> list[dict]:
+        return await run_in_threadpool(lambda: list(cls.model.objects.aggregate(pipeline)))
+
+    @classmethod
+    async def find_raw_by_ids(cls, ids: list, projection: Optional[dict] = None) -> dict[Any, dict]:
+        """Loads the raw documents with these ids in one $in query, keyed by _id."""
+        if not ids:
+            return {}
+
+        def query() -> dict[Any, dict]:
+            cursor = cls.collection().find({"_id": {"$in": list(ids)}}, projection)
+            return {document["_id"]: document for document in cursor}
+
+        return await run_in_threadpool(query)
+
+    @classmethod
+    async def save(cls, document: T) -> T:
+        return await run_in_threadpool(document.save)
+
+    @classmethod
+    def collection(cls) -> Collection:
+        return cls.model._get_collection()
+
+    # mongoengine's save() ignores the session, so writes that must be part
+    # of a transaction go through the collection directly.
+    @classmethod
+    def insert_with_session(cls, document: T, session: ClientSession) -> T:
+        document.validate()
+        result = cls.collection().insert_one(document.to_mongo(), session=session)
+        document.pk = result.inserted_id
+        document._created = False
+        document._clear_changed_fields()
+        return document
+
+    @classmethod
+    def insert_many_with_session(cls, documents: list[T], session: ClientSession) -> list[T]:
+        if not documents:
+            return documents
+
+        for document in documents:
+            document.validate()
+
+        result = cls.collection().insert_many([document.to_mongo() for document in documents], session=session)
+        for document, inserted_id in zip(documents, result.inserted_ids):
+            document.pk = inserted_id
+            document._created = False
+            document._clear_changed_fields()
+        return documents
+
+
+def run_in_transaction_sync(callback: Callable[[ClientSession], R]) -> R:
+    """Runs callback(session) inside a Mongo transaction, for code that already runs in the threadpool."""
+    with get_db().client.start_session() as session:
+        with session.start_transaction():
+            return callback(session)
+
+
+def projection(fields: list[str]) -> dict:
+    """The projection of a raw query or a $project stage that only keeps these fields."""
+    return {field: 1 for field in fields}
+
+
+def lookup_by_id(from_collection: str, local_field: str, fields: list[str], as_field: str) -> dict:
+    """A $lookup stage joining the document referenced by local_field, with only these fields.
+
+    Written with let and $expr, combining localField with a pipeline requires MongoDB 5.0.
+    """
+    return {
+        "$lookup": {
+            "from": from_collection,
+            "let": {"id": f"${local_field}"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$id"]}}},
+                {"$project": projection(fields)}
+            ],
+            "as": as_field
+        }
+    }
+
+
+async def run_in_transaction(callback: Callable[[ClientSession], R]) -> R:
+    """Runs callback(session) inside a Mongo transaction, off the event loop."""
+    return await run_in_threadpool(run_in_transaction_sync, callback)
+
+
+async def run_blocking(callback: Callable[..., R], *args: Any, **kwargs: Any) -> R:
+    return await run_in_threadpool(callback, *args, **kwargs)
@@ -0,0 +1,5 @@
+from models.category import Category
+from .base import BaseRepository
+
+class CategoryRepository(BaseRepository[Category]):
+    model = Category
@@ -0,0 +1,5 @@
+from models.financial_line import FinancialLine
+from .base import BaseRepository
+
+class FinancialLineRepository(BaseRepository[FinancialLine]):
+    model = FinancialLine
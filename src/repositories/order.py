@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Optional
+from models.order import Order
+from .base import BaseRepository, lookup_by_id, projection, run_blocking
+
+class OrderRepository(BaseRepository[Order]):
+    model = Order
+
+    @classmethod
+    async def next_expiry(cls, statuses:list[str]) -> Optional[datetime]:
+        """The earliest expires_at of the orders in these statuses, read from the (status, expires_at) index."""
+        def query() -> Optional[datetime]:
+            order = cls.collection().find_one(
+                {"status": {"$in": statuses}, "expires_at": {"$ne": None}},
+                {"expires_at": 1},
+                sort=[("expires_at", 1)]
+            )
+            return order["expires_at"] if order else None
+
+        return await run_blocking(query)
+
+    @classmethod
+    async def find_joined(cls, match:dict, sort:dict, skip:int, limit:int, fields:list[str], client_fields:list[str]) -> list[dict]:
+        """One page of orders with their client in one round trip, the ordered products carry their own snapshot."""
+        pipeline = [
+            {"$match": match},
+            {"$sort": sort},
+            {"$skip": skip},
+            {"$limit": limit},
+            {"$project": projection(fields)},
+            # The join only runs for the orders of the page
+            lookup_by_id("user", "client", client_fields, "client"),
+            {
+                "$set": {"client": {"$arrayElemAt": ["$client", 0]}}
+            }
+        ]
+
+        return await cls.aggregate(pipeline)
@@ -0,0 +1,5 @@
+from models.processed_stripe_event import ProcessedStripeEvent
+from .base import BaseRepository
+
+class ProcessedStripeEventRepository(BaseRepository[ProcessedStripeEvent]):
+    model = ProcessedStripeEvent
@@ -0,0 +1,96 @@
+from typing import NamedTuple, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.client_session import ClientSession
+from models.product import Product
+from .base import BaseRepository
+
+class ProductForOrder(NamedTuple):
+    product: Product
+    seller_deleted: bool
+    seller_id: ObjectId
+    seller_name: Optional[str]
+    category_id: ObjectId
+    category_name: Optional[str]
+
+class ProductRepository(BaseRepository[Product]):
+    model = Product
+
+    @classmethod
+    async def find_active_with_seller_status(cls, product_ids:list[ObjectId]) -> dict[ObjectId, ProductForOrder]:
+        """Loads the non deleted products, the status and name of their seller and the name of their category in one round trip."""
+        pipeline = [
+            {
+                "$match": {"_id": {"$in": product_ids}, "deleted": False}
+            },
+            {
+                "$lookup": {
+                    "from": "user",
+                    "localField": "seller",
+                    "foreignField": "_id",
+                    "as": "_seller"
+                }
+            },
+            {
+                "$lookup": {
+                    "from": "category",
+                    "localField": "category",
+                    "foreignField": "_id",
+                    "as": "_category"
+                }
+            },
+            {
+                "$set": {
+                    "_seller_deleted": {"$ifNull": [{"$arrayElemAt": ["$_seller.deleted", 0]}, True]},
+                    "_seller_name": {"$arrayElemAt": ["$_seller.fullname", 0]},
+                    "_category_name": {"$arrayElemAt": ["$_category.name", 0]}
+                }
+            },
+            {
+                "$unset": ["_seller", "_category"]
+            }
+        ]
+
+        documents = await cls.aggregate(pipeline)
+
+        products = {}
+        for document in documents:
+            seller_deleted = document.pop("_seller_deleted")
+            seller_name = document.pop("_seller_name", None)
+            category_name = document.pop("_category_name", None)
+            products[document["_id"]] = ProductForOrder(
+                product=Product._from_son(document),
+                seller_deleted=seller_deleted,
+                seller_id=document["seller"],
+                seller_name=seller_name,
+                category_id=document["category"],
+                category_name=category_name
+            )
+
+        return products
+
+    @classmethod
+    def take_stock(cls, product_id:ObjectId, quantity:int) -> bool:
+        """Atomically decrements the stock of a product, only if enough is left."""
+        result = cls.collection().update_one(
+            {"_id": product_id, "deleted": False, "quantity": {"$gte": quantity}},
+            {"$inc": {"quantity": -quantity}}
+        )
+        return result.modified_count == 1
+
+    @classmethod
+    def restore_stock(cls, quantities:dict[ObjectId, int], session:Optional[ClientSession] = None) -> None:
+        """Gives the stock back to every product in a single bulk write."""
+        operations = [
+            UpdateOne({"_id": product_id}, {"$inc": {"quantity": quantity}})
+            for product_id, quantity in quantities.items()
+        ]
+
+        if operations:
+            cls.collection().bulk_write(operations, ordered=False, session=session)
+
+    @classmethod
+    def find_sellers(cls, product_ids:list[ObjectId]) -> dict[ObjectId, ObjectId]:
+        """Maps every product to its seller id with one projected query."""
+        cursor = cls.collection().find({"_id": {"$in": product_ids}}, {"seller": 1})
+        return {document["_id"]: document["seller"] for document in cursor}
@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Optional
+from pymongo import ReturnDocument
+from models.refresh_token import RefreshToken
+from .base import BaseRepository, run_blocking
+
+class RefreshTokenRepository(BaseRepository[RefreshToken]):
+    model = RefreshToken
+
+    @classmethod
+    async def consume(cls, token_hash:str) -> Optional[dict]:
+        """Atomically revokes a valid token and returns it as stored, None if it was not valid anymore."""
+        return await run_blocking(
+            cls.collection().find_one_and_update,
+            {"token_hash": token_hash, "revoked": False, "expires_at": {"$gt": datetime.utcnow()}},
+            {"$set": {"revoked": True, "updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.BEFORE
+        )
+
+    @classmethod
+    async def find_by_hash(cls, token_hash:str) -> Optional[dict]:
+        return await run_blocking(cls.collection().find_one, {"token_hash": token_hash})
+
+    @classmethod
+    async def revoke_family(cls, family:str) -> None:
+        await run_blocking(
+            cls.collection().update_many,
+            {"family": family, "revoked": False},
+            {"$set": {"revoked": True, "updated_at": datetime.utcnow()}}
+        )
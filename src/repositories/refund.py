@@ -0,0 +1,5 @@
+from models.refund import Refund
+from .base import BaseRepository
+
+class RefundRepository(BaseRepository[Refund]):
+    model = Refund
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo.errors import DuplicateKeyError
+from models.scheduler_lock import SchedulerLock
+from .base import BaseRepository, run_blocking
+
+class SchedulerLockRepository(BaseRepository[SchedulerLock]):
+    model = SchedulerLock
+
+    @classmethod
+    async def acquire(cls, name:str, owner:str, lease_in_seconds:int) -> bool:
+        """Takes the lock if it is free or its lease expired. The unique name makes a concurrent upsert fail."""
+        now = datetime.utcnow()
+        try:
+            await run_blocking(
+                cls.collection().update_one,
+                {"name": name, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+                {
+                    "$set": {"owner": owner, "expires_at": now + timedelta(seconds=lease_in_seconds), "updated_at": now},
+                    "$setOnInsert": {"created_at": now, "deleted": False}
+                },
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    @classmethod
+    async def held_until(cls, name:str) -> Optional[datetime]:
+        """When the current lease of the lock ends, None if nobody holds it."""
+        lock = await run_blocking(cls.collection().find_one, {"name": name}, {"expires_at": 1})
+        return lock["expires_at"] if lock else None
+
+    @classmethod
+    async def renew(cls, name:str, owner:str, lease_in_seconds:int) -> bool:
+        now = datetime.utcnow()
+        result = await run_blocking(
+            cls.collection().update_one,
+            {"name": name, "owner": owner},
+            {"$set": {"expires_at": now + timedelta(seconds=lease_in_seconds), "updated_at": now}}
+        )
+        return result.matched_count == 1
+
+    @classmethod
+    async def release(cls, name:str, owner:str, held_until:datetime) -> None:
+        """Lets the lease expire at held_until, or right away if that is already past."""
+        await run_blocking(
+            cls.collection().update_one,
+            {"name": name, "owner": owner},
+            {"$set": {"expires_at": held_until, "updated_at": datetime.utcnow()}}
+        )
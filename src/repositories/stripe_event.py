@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from mongoengine import NotUniqueError
+from pymongo import ReturnDocument
+from enums.stripe_event_status import EnumStripeEventStatus
+from models.stripe_event import StripeEvent
+from .base import BaseRepository, run_blocking
+
+class StripeEventRepository(BaseRepository[StripeEvent]):
+    model = StripeEvent
+
+    @classmethod
+    async def enqueue(cls, event_id:str, type:str, payload:str) -> bool:
+        """Stores the event to be processed, returns False if it was received already."""
+        now = datetime.utcnow()
+        try:
+            await cls.save(StripeEvent(event_id=event_id, type=type, payload=payload, next_attempt_at=now, created_at=now))
+            return True
+        except NotUniqueError:
+            return False
+
+    @classmethod
+    async def claim_next(cls, lock_timeout_in_seconds:int) -> Optional[dict]:
+        """Atomically locks the next due event for this worker. An event locked for longer than the timeout belongs to a worker that died."""
+        now = datetime.utcnow()
+        return await run_blocking(
+            cls.collection().find_one_and_update,
+            {
+                "$or": [
+                    {
+                        "status": {"$in": [EnumStripeEventStatus.PENDING.value, EnumStripeEventStatus.FAILED.value]},
+                        "next_attempt_at": {"$lte": now}
+                    },
+                    {
+                        "status": EnumStripeEventStatus.PROCESSING.value,
+                        "locked_at": {"$lt": now - timedelta(seconds=lock_timeout_in_seconds)}
+                    }
+                ]
+            },
+            {
+                "$set": {"status": EnumStripeEventStatus.PROCESSING.value, "locked_at": now, "updated_at": now},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    @classmethod
+    async def mark_processed(cls, id) -> None:
+        await run_blocking(
+            cls.collection().update_one,
+            {"_id": id},
+            {
+                "$set": {"status": EnumStripeEventStatus.PROCESSED.value, "updated_at": datetime.utcnow()},
+                "$unset": {"locked_at": "", "last_error": ""}
+            }
+        )
+
+    @classmethod
+    async def mark_failed(cls, id, error:str, next_attempt_at:Optional[datetime]) -> None:
+        """Schedules another attempt, or moves the event to the dead letters when next_attempt_at is None."""
+        status = EnumStripeEventStatus.FAILED if next_attempt_at is not None else EnumStripeEventStatus.DEAD_LETTER
+        values = {"status": status.value, "last_error": error, "updated_at": datetime.utcnow()}
+        if next_attempt_at is not None:
+            values["next_attempt_at"] = next_attempt_at
+
+        await run_blocking(
+            cls.collection().update_one,
+            {"_id": id},
+            {"$set": values, "$unset": {"locked_at": ""}}
+        )
@@ -0,0 +1,5 @@
+from models.user import User
+from .base import BaseRepository
+
+class UserRepository(BaseRepository[User]):
+    model = User
@@ -12,6 +12,7 @@ from utils.orchestration_result import  OrchestrationResultType
 from dependencies.validate_roles import validate_roles
 from services.admin import AdminService
 from utils_types.user_info_in_token import UserInfoInToken
+from utils.fast_json_response import FastJSONResponse
 
 router = APIRouter(tags=['Administration'], prefix='/admin')
 
@@ -38,9 +39,11 @@ async def find_users(
     limit: int = 10,
     name:str = Query(default=None),
     email:str = Query(default=None),
+    after:str = Query(default=None),
+    include_total:bool = Query(default=True),
     user_info: UserInfoInToken = Depends(validate_roles([EnumUserRole.ADMIN.value]))
 ):
-    result: OrchestrationResultType[UserResponseModel] = await AdminService.find_users(page, limit, name, email, user_info)
+    result: OrchestrationResultType[UserResponseModel] = await AdminService.find_users(page, limit, name, email, user_info, after, include_total)
 
     if result.get('code') == EnumResponseCode.FAILED.value:
         response.status_code = status.HTTP_400_BAD_REQUEST
@@ -48,7 +51,7 @@ async def find_users(
     if result.get('code') == EnumResponseCode.SERVER_ERROR.value:
         response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR    
     
-    return result
+    return FastJSONResponse.from_result(result, response, status.HTTP_200_OK)
 
 
 @router.delete('/users/{user_id}', status_code=status.HTTP_200_OK, response_model=OrchestrationResultType[UserResponseModel])
@@ -184,12 +187,14 @@ async def get_refund(
 @router.get('/refund', status_code=status.HTTP_200_OK, response_model=OrchestrationResultType[Paginated[RefundResponseModel]])
 async def get_refunds(
     response: Response, 
-    status:EnumRefundStatus = Query(),
+    refund_status:EnumRefundStatus = Query(alias='status'),
     page:int = 1,
     limit:int = 10,    
+    after:str = Query(default=None),
+    include_total:bool = Query(default=True),
     _: UserInfoInToken = Depends(validate_roles([EnumUserRole.ADMIN.value]))
 ):
-    result: OrchestrationResultType[Paginated[RefundResponseModel]] = await AdminService.get_refunds(page, limit, status)
+    result: OrchestrationResultType[Paginated[RefundResponseModel]] = await AdminService.get_refunds(page, limit, refund_status, after, include_total)
 
     if result.get('code') == EnumResponseCode.FAILED.value:
         response.status_code = status.HTTP_400_BAD_REQUEST
@@ -197,5 +202,5 @@ async def get_refunds(
     if result.get('code') == EnumResponseCode.SERVER_ERROR.value:
         response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR    
     
-    return result
+    return FastJSONResponse.from_result(result, response, status.HTTP_200_OK)
 
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, status, Response, Depends
-from enums.response_codes import EnumResponseCode
+from enums.response_codes import EnumResponseCode, EnumResponseStatusCode
 from services.auth import AuthService
-from dto.request.user import CreateUserRequestDto, LoginUserRequestDto, UpdateUserRequestDto
+from dto.request.user import CreateUserRequestDto, LoginUserRequestDto, RefreshTokenRequestDto, UpdateUserRequestDto
 from dto.response.user import  UserResponseModel, LoginResponseModel
 from utils.orchestration_result import  OrchestrationResultType
 from dependencies.get_user import user_info_dependency
@@ -15,6 +15,10 @@ async def create_account(response: Response, user_request: CreateUserRequestDto)
     if result.get('code') == EnumResponseCode.FAILED.value:
         response.status_code = status.HTTP_400_BAD_REQUEST
 
+    if result.get('status_code') == EnumResponseStatusCode.TOO_MANY_REQUESTS.value:
+        response.status_code = status.HTTP_429_TOO_MANY_REQUESTS
+        response.headers['Retry-After'] = '1'
+
     if result.get('code') == EnumResponseCode.SERVER_ERROR.value:
         response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR    
     
@@ -24,6 +28,34 @@ async def create_account(response: Response, user_request: CreateUserRequestDto)
 async def login(response: Response, login_request: LoginUserRequestDto):
     result: OrchestrationResultType[LoginResponseModel] = await AuthService.login(login_request)
 
+    if result.get('code') == EnumResponseCode.FAILED.value:
+        response.status_code = status.HTTP_400_BAD_REQUEST
+
+    if result.get('status_code') == EnumResponseStatusCode.TOO_MANY_REQUESTS.value:
+        response.status_code = status.HTTP_429_TOO_MANY_REQUESTS
+        response.headers['Retry-After'] = '1'
+
+    if result.get('code') == EnumResponseCode.SERVER_ERROR.value:
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR    
+    
+    return result
+
+@router.post('/refresh', status_code=status.HTTP_200_OK, response_model=OrchestrationResultType[LoginResponseModel])
+async def refresh_access_token(response: Response, refresh_request: RefreshTokenRequestDto):
+    result: OrchestrationResultType[LoginResponseModel] = await AuthService.refresh_access_token(refresh_request)
+
+    if result.get('code') == EnumResponseCode.FAILED.value:
+        response.status_code = status.HTTP_401_UNAUTHORIZED
+
+    if result.get('code') == EnumResponseCode.SERVER_ERROR.value:
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR    
+    
+    return result
+
+@router.post('/logout', status_code=status.HTTP_200_OK, response_model=OrchestrationResultType[None])
+async def logout(response: Response, logout_request: RefreshTokenRequestDto):
+    result: OrchestrationResultType[None] = await AuthService.logout(logout_request)
+
     if result.get('code') == EnumResponseCode.FAILED.value:
         response.status_code = status.HTTP_400_BAD_REQUEST
 
@@ -3,6 +3,7 @@ from dto.response.category import CategoryResponseModel
 from enums.response_codes import EnumResponseCode
 from utils.orchestration_result import  OrchestrationResultType
 from services.category import CategoryService
+from utils.fast_json_response import FastJSONResponse
 
 router = APIRouter(tags=['Categories'], prefix='/category')
 
@@ -18,4 +19,4 @@ async def get_categories(
     if result.get('code') == EnumResponseCode.SERVER_ERROR.value:
         response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR    
     
-    return result
\ No newline at end of file
+    return FastJSONResponse.from_result(result, response, status.HTTP_200_OK)
\ No newline at end of file
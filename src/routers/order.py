@@ -14,6 +14,7 @@ from utils.orchestration_result import  OrchestrationResultType
 from dependencies.validate_roles import validate_roles
 from services.order import OrderService
 from utils_types.user_info_in_token import UserInfoInToken
+from utils.fast_json_response import FastJSONResponse
 
 router = APIRouter(tags=['Order'], prefix='/order')
 
@@ -39,9 +40,11 @@ async def get_my_orders(
     page:int = 1,
     limit:int = 10,
     order_status: EnumOrderStatus = Query(default=None),
+    after: str = Query(default=None),
+    include_total: bool = Query(default=True),
     user_info: UserInfoInToken = Depends(validate_roles([EnumUserRole.CLIENT.value]))
 ):
-    result: OrchestrationResultType[Paginated[OrderResponseModel]] = await OrderService.get_my_orders(page=page, limit=limit, user_info=user_info, order_status=order_status)
+    result: OrchestrationResultType[Paginated[OrderResponseModel]] = await OrderService.get_my_orders(page=page, limit=limit, user_info=user_info, order_status=order_status, after=after, include_total=include_total)
 
     if result.get('code') == EnumResponseCode.FAILED.value:
         response.status_code = status.HTTP_400_BAD_REQUEST
@@ -49,7 +52,7 @@ async def get_my_orders(
     if result.get('code') == EnumResponseCode.SERVER_ERROR.value:
         response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR    
     
-    return result
+    return FastJSONResponse.from_result(result, response, status.HTTP_200_OK)
 
 @router.post('/cancel/paid/{order_id}', status_code=status.HTTP_200_OK, response_model=OrchestrationResultType[OrderResponseModel])
 async def cancel_paid_order(
@@ -104,9 +107,11 @@ async def get_my_refunds(
     response: Response, 
     page:int = 1,
     limit:int = 10,
+    after: str = Query(default=None),
+    include_total: bool = Query(default=True),
     user_info: UserInfoInToken = Depends(validate_roles([EnumUserRole.CLIENT.value]))
 ):
-    result: OrchestrationResultType[Paginated[RefundResponseModel]] = await OrderService.get_my_refunds(page=page, limit=limit, user_info=user_info)
+    result: OrchestrationResultType[Paginated[RefundResponseModel]] = await OrderService.get_my_refunds(page=page, limit=limit, user_info=user_info, after=after, include_total=include_total)
 
     if result.get('code') == EnumResponseCode.FAILED.value:
         response.status_code = status.HTTP_400_BAD_REQUEST
@@ -114,4 +119,4 @@ async def get_my_refunds(
     if result.get('code') == EnumResponseCode.SERVER_ERROR.value:
         response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR    
     
-    return result
\ No newline at end of file
+    return FastJSONResponse.from_result(result, response, status.HTTP_200_OK)
\ No newline at end of file
@@ -12,6 +12,7 @@ from utils.orchestration_result import  OrchestrationResultType
 from dependencies.validate_roles import validate_roles
 from services.product import ProductService
 from utils_types.user_info_in_token import UserInfoInToken
+from utils.fast_json_response import FastJSONResponse
 
 router = APIRouter(tags=['Products'], prefix='/product')
 
@@ -41,6 +42,10 @@ async def search_product(
     category_id: str = Query(default=None),
     min_price: float = Query(default=None),
     max_price: float = Query(default=None),
+    estimate_total: bool = Query(default=False),
+    after: str = Query(default=None),
+    include_total: bool = Query(default=True),
+    q: str = Query(default=None),
 ):
     result: OrchestrationResultType[Paginated[ProductResponseModel]] = await ProductService.search_product(
         page,
@@ -50,6 +55,10 @@ async def search_product(
         category_id,
         min_price,
         max_price,
+        estimate_total,
+        after,
+        include_total,
+        q,
     )
 
     if result.get('code') == EnumResponseCode.FAILED.value:
@@ -58,7 +67,7 @@ async def search_product(
     if result.get('code') == EnumResponseCode.SERVER_ERROR.value:
         response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR    
     
-    return result
+    return FastJSONResponse.from_result(result, response, status.HTTP_201_CREATED)
 
 @router.delete('/{product_id}', status_code=status.HTTP_200_OK, response_model=OrchestrationResultType[ProductResponseModel])
 async def delete_product(
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, Header, Request
-from enums.enum_stripe_event import EnumStripeEventType
+import json
 import stripe
 from utils.config import stripe_webhook_key
-from services.webhook import WebhookService
+from repositories.stripe_event import StripeEventRepository
+from tasks.stripe_event_consumer import stripe_event_consumer
 
 router = APIRouter(tags=['Webhook'])
 
@@ -25,35 +26,16 @@ async def stripe_webhook(
         raise HTTPException(status_code=400, detail="Invalid signature")
 
     try:
-        event_type = event['type']
-        session = event['data']['object']
-
-        if event_type == EnumStripeEventType.CHECKOUT_SESSION_COMPLETED.value:
-            order_id = session.get('metadata', {}).get('order_id')
-            payment_intent_id = session.get('payment_intent')
-            WebhookService.checkout_success(order_id, payment_intent_id)
-
-        elif event_type == EnumStripeEventType.PAYMENT_INTENT_FAILED.value:
-            order_id = session.get('metadata', {}).get('order_id')
-            payment_intent_id = session.get('id')
-            WebhookService.payment_intent_failed(order_id=order_id, payment_intent_id=payment_intent_id)
-
-        elif event_type == EnumStripeEventType.REFUND_CREATED.value:
-            refund_id = session.get('id')
-            WebhookService.handle_refund_created(refund_id=refund_id)
-
-        elif event_type == EnumStripeEventType.REFUND_UPDATED.value:
-            refund_id = session.get('id')
-            status = session.get('status')
-            if status == 'succeeded':
-                WebhookService.handle_refund_succeeded(refund_id=refund_id)
-
-        elif event_type == EnumStripeEventType.REFUND_FAILED.value:
-            refund_id = session.get('id')
-            WebhookService.handle_refund_failed(refund_id=refund_id)
-
+        # Processed by the consumer, so that Stripe gets its answer without waiting for the transactions
+        await StripeEventRepository.enqueue(
+            event_id=event['id'],
+            type=event['type'],
+            payload=json.dumps(json.loads(payload)['data']['object'])
+        )
     except Exception as e:
-        print(f"Error handling Stripe event: {e}")
+        print(f"Error storing Stripe event: {e}")
         raise HTTPException(status_code=500, detail="Internal webhook processing error")
 
+    stripe_event_consumer.notify()
+
     return {"status": "success"}
@@ -1,19 +1,101 @@
 # scheduler.py
 # from apscheduler.schedulers.background import BackgroundScheduler
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from apscheduler.schedulers.asyncio import AsyncIOScheduler  # ✅ Use AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-from tasks.cleanup_pending_orders import cleanup_pending_orders
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from repositories.order import OrderRepository
+from tasks.cleanup_pending_orders import EXPIRABLE_STATUSES, cleanup_pending_orders
 from utils.config import cron_job_minutes_interval
+from utils.lease_lock import LeaseHeldError, LeaseLock
 
 # scheduler = BackgroundScheduler()
 scheduler = AsyncIOScheduler()  # ✅ Use async scheduler
 
+ORDER_EXPIRY_JOB_ID = "cleanup_pending_orders"
+ORDER_EXPIRY_WATCHDOG_JOB_ID = "cleanup_pending_orders_watchdog"
+
+# The next run is never planned sooner than this, APScheduler drops a run that is due while the job is still running
+MIN_DELAY_IN_SECONDS = 5
+FAILURE_BACKOFF_IN_SECONDS = 30
+
+guarded_cleanup_pending_orders = LeaseLock.guard("cleanup_pending_orders", cleanup_pending_orders)
+
+consecutive_failures = 0
+
+# Instead of scanning on a fixed interval, the cleanup runs when the next unpaid order expires.
+# CRON_JOB_MINUTES_INTERVAL is only the longest it sleeps, to see the orders created by the other instances.
+async def expire_orders():
+    global consecutive_failures
+
+    not_before: Optional[datetime] = None
+    try:
+        report = await guarded_cleanup_pending_orders()
+        consecutive_failures = consecutive_failures + 1 if report.get("failed") else 0
+    except LeaseHeldError as exc:
+        # The holder cancels what expires until its lease ends
+        not_before = exc.held_until
+    except Exception as exc:
+        print(f"Failed to expire orders: {exc}")
+        consecutive_failures += 1
+
+    if consecutive_failures:
+        backoff = min(FAILURE_BACKOFF_IN_SECONDS * 2 ** (consecutive_failures - 1), int(cron_job_minutes_interval) * 60)
+        backoff_until = datetime.utcnow() + timedelta(seconds=backoff)
+        not_before = max(not_before, backoff_until) if not_before else backoff_until
+
+    await schedule_next_order_expiry(not_before)
+
+async def schedule_next_order_expiry(not_before:Optional[datetime] = None):
+    next_expiry: Optional[datetime] = None
+    try:
+        next_expiry = await OrderRepository.next_expiry(EXPIRABLE_STATUSES)
+    except Exception as exc:
+        print(f"Failed to find the next order expiry: {exc}")
+
+    run_at = datetime.utcnow() + timedelta(minutes=int(cron_job_minutes_interval))
+    if next_expiry is not None and next_expiry < run_at:
+        run_at = next_expiry
+    if not_before is not None and not_before > run_at:
+        run_at = not_before
+
+    _run_expire_orders_at(run_at)
+
+def schedule_order_expiry(expires_at:datetime):
+    """Brings the next run forward if this order expires before it."""
+    job = scheduler.get_job(ORDER_EXPIRY_JOB_ID)
+    if job is not None and job.next_run_time is not None and job.next_run_time <= expires_at.replace(tzinfo=timezone.utc):
+        return
+
+    _run_expire_orders_at(expires_at)
+
+async def ensure_order_expiry_job():
+    # Safety net, the one-shot job must always be planned
+    if scheduler.get_job(ORDER_EXPIRY_JOB_ID) is None:
+        print("The order expiry job was missing, scheduling it again")
+        _run_expire_orders_at(datetime.utcnow())
+
+def _run_expire_orders_at(run_at:datetime):
+    run_at = max(run_at, datetime.utcnow() + timedelta(seconds=MIN_DELAY_IN_SECONDS))
+
+    # The dates of the orders are naive UTC
+    scheduler.add_job(
+        expire_orders,
+        DateTrigger(run_date=run_at.replace(tzinfo=timezone.utc)),
+        id=ORDER_EXPIRY_JOB_ID,
+        replace_existing=True,
+        coalesce=True,
+        misfire_grace_time=None
+    )
 
 def start_scheduler():
+    # Runs right away, that also cancels what expired while the service was down
+    _run_expire_orders_at(datetime.utcnow())
     scheduler.add_job(
-        cleanup_pending_orders,
-        CronTrigger(minute=f'*/{cron_job_minutes_interval}'), 
-        id="cleanup_pending_orders",
+        ensure_order_expiry_job,
+        IntervalTrigger(minutes=int(cron_job_minutes_interval)),
+        id=ORDER_EXPIRY_WATCHDOG_JOB_ID,
         replace_existing=True
     )
-    scheduler.start()
\ No newline at end of file
+    scheduler.start()
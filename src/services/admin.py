@@ -1,8 +1,9 @@
 import math
+from typing import Optional
 from dto.request.category import CreateCategoryDto, UpdateCategoryDto
 from dto.response.category import CategoryResponseModel, CategoryResponseParser
-from dto.response.refund import RefundResponseModel, RefundResponseParser
-from dto.response.user import UserResponseModel, UserResponseParser 
+from dto.response.refund import REFUND_RESPONSE_FIELDS, RefundResponseModel, RefundResponseParser
+from dto.response.user import USER_RESPONSE_FIELDS, UserResponseModel, UserResponseParser 
 from dto.response.user import UserResponseParser 
 from enums.refund_status import EnumRefundStatus
 from enums.response_codes import EnumResponseStatusCode
@@ -11,7 +12,15 @@ from models import order
 from models.category import Category
 from models.refund import Refund
 from models.user import User
+from repositories.category import CategoryRepository
+from repositories.order import OrderRepository
+from repositories.refund import RefundRepository
+from repositories.user import UserRepository
 from services.stripe import StripeService
+from utils.cursor_utils import SORT_ORDER, CursorUtils
+from utils.category_cache import CategoryCache
+from utils.user_cache import UserCache
+from utils.prefetch import Prefetch
 from utils.orchestration_result import OrchestrationResult, OrchestrationResultType
 from datetime import datetime
 from mongoengine import Q
@@ -22,7 +31,7 @@ class AdminService:
     @staticmethod
     async def delete_account(user_id:str, user_info:UserInfoInToken) -> OrchestrationResultType[UserResponseModel]:
         try:
-            user: User = User.objects(id=user_id).first()
+            user: User = await UserRepository.find_one(id=user_id)
 
             if user is None:
                 return OrchestrationResult.failure(
@@ -45,7 +54,8 @@ class AdminService:
             user.deleted = True
             user.deleted_at = datetime.utcnow()               
             
-            user.save()
+            await UserRepository.save(user)
+            UserCache.invalidate(user.id)
 
             return OrchestrationResult.success(
                 data=UserResponseParser.parse(user), 
@@ -59,7 +69,7 @@ class AdminService:
     @staticmethod
     async def restore_account(user_id:str, user_info:UserInfoInToken) -> OrchestrationResultType[UserResponseModel]:
         try:
-            user: User = User.objects(id=user_id).first()
+            user: User = await UserRepository.find_one(id=user_id)
 
             if user is None:
                 return OrchestrationResult.failure(
@@ -82,7 +92,8 @@ class AdminService:
             user.deleted = False
             user.deleted_at = None               
             
-            user.save()
+            await UserRepository.save(user)
+            UserCache.invalidate(user.id)
 
             return OrchestrationResult.success(
                 data=UserResponseParser.parse(user), 
@@ -94,8 +105,16 @@ class AdminService:
             return OrchestrationResult.server_error()
     
     @staticmethod
-    async def find_users(page:int, limit:int, name:str, email:str, user_info:UserInfoInToken) -> OrchestrationResultType[UserResponseModel]:
+    async def find_users(page:int, limit:int, name:str, email:str, user_info:UserInfoInToken, after:Optional[str] = None, include_total:bool = True) -> OrchestrationResultType[UserResponseModel]:
         try:
+            try:
+                cursor_query = CursorUtils.after_query(after) if after else Q()
+            except ValueError:
+                return OrchestrationResult.failure(
+                    status_code=EnumResponseStatusCode.INVALID_CURSOR,
+                    message='Invalid cursor.'
+                )
+
             filters = Q(
                 deleted=False, 
                 # id__ne=str(user_info.id)
@@ -107,11 +126,12 @@ class AdminService:
             if email is not None:
                 filters &= Q(email=email)
 
-            skip = (page - 1) * limit
-            total_items = User.objects(filters).count()
-            total_pages = math.ceil(total_items / limit)
+            skip = 0 if after else (page - 1) * limit
+            total_items = await UserRepository.count(filters) if include_total else None
+            total_pages = math.ceil(total_items / limit) if include_total else None
 
-            users: list[User] = User.objects(filters).skip(skip).limit(limit)
+            users: list[dict] = await UserRepository.find_raw(filters & cursor_query, fields=USER_RESPONSE_FIELDS, skip=skip, limit=limit + 1, order_by=SORT_ORDER)
+            users, next_cursor = CursorUtils.next_page(users, limit)
 
             return OrchestrationResult.success(
                 data=UserResponseParser.parse_paginated(
@@ -119,7 +139,8 @@ class AdminService:
                     total_pages=total_pages,
                     limit=limit,
                     page=page,
-                    total_items=total_items
+                    total_items=total_items,
+                    next_cursor=next_cursor
                 ), 
                 message='Recovered successfully successfully', 
                 status_code=EnumResponseStatusCode.RECOVERED_SUCCESSFULLY
@@ -131,7 +152,7 @@ class AdminService:
     @staticmethod
     async def change_user_role(user_id:str, role:EnumUserRole, user_info:UserInfoInToken) -> OrchestrationResultType[UserResponseModel]:
         try:
-            user: User = User.objects(id=user_id, deleted=False).first()
+            user: User = await UserRepository.find_one(id=user_id, deleted=False)
 
             if user is None:
                 return OrchestrationResult.failure(
@@ -154,7 +175,8 @@ class AdminService:
             user.role = role.value
             user.updated_at = datetime.utcnow()               
             
-            user.save()
+            await UserRepository.save(user)
+            UserCache.invalidate(user.id)
 
             return OrchestrationResult.success(
                 data=UserResponseParser.parse(user), 
@@ -169,7 +191,8 @@ class AdminService:
     async def create_category(category_request:CreateCategoryDto) -> OrchestrationResultType[CategoryResponseModel]:
         try:
             category: Category = Category(**category_request.model_dump())
-            category.save()
+            await CategoryRepository.save(category)
+            await CategoryCache.refresh()
 
             return OrchestrationResult.success(
                 data=CategoryResponseParser.parse(category=category), 
@@ -183,7 +206,7 @@ class AdminService:
     @staticmethod
     async def update_category(category_id:str, category_request:UpdateCategoryDto) -> OrchestrationResultType[CategoryResponseModel]:
         try:
-            category: Category = Category.objects(id=category_id, deleted=False).first()
+            category: Category = await CategoryRepository.find_one(id=category_id, deleted=False)
 
             if not category:
                 return OrchestrationResult.failure(
@@ -193,7 +216,8 @@ class AdminService:
             
             category.name = category_request.name if category_request.name else category.name
             category.description = category_request.description if category_request.description else category.description
-            category.save()
+            await CategoryRepository.save(category)
+            await CategoryCache.refresh()
 
             return OrchestrationResult.success(
                 data=CategoryResponseParser.parse(category=category), 
@@ -207,7 +231,7 @@ class AdminService:
     @staticmethod
     async def delete_category(category_id:str) -> OrchestrationResultType[CategoryResponseModel]:
         try:
-            category: Category = Category.objects(id=category_id).first()
+            category: Category = await CategoryRepository.find_one(id=category_id)
 
             if not category:
                 return OrchestrationResult.failure(
@@ -223,7 +247,8 @@ class AdminService:
             
             category.deleted = True
             category.deleted_at = datetime.utcnow()
-            category.save()
+            await CategoryRepository.save(category)
+            await CategoryCache.refresh()
 
             return OrchestrationResult.success(
                 data=CategoryResponseParser.parse(category=category), 
@@ -237,7 +262,7 @@ class AdminService:
     @staticmethod
     async def restore_category(category_id:str) -> OrchestrationResultType[CategoryResponseModel]:
         try:
-            category: Category = Category.objects(id=category_id).first()
+            category: Category = await CategoryRepository.find_one(id=category_id)
 
             if not category:
                 return OrchestrationResult.failure(
@@ -253,7 +278,8 @@ class AdminService:
             
             category.deleted = False
             category.deleted_at = None
-            category.save()
+            await CategoryRepository.save(category)
+            await CategoryCache.refresh()
 
             return OrchestrationResult.success(
                 data=CategoryResponseParser.parse(category=category), 
@@ -267,7 +293,7 @@ class AdminService:
     @staticmethod
     async def retry_refund(refund_id:str) -> OrchestrationResultType[RefundResponseModel]:
         try:
-            refund: Refund = Refund.objects(id=refund_id).first()
+            refund: Refund = await RefundRepository.find_one(id=refund_id)
 
             if not refund:
                 return OrchestrationResult.failure(
@@ -281,17 +307,27 @@ class AdminService:
                     message='Can only retry failed refunds.'
                 )
             
+            # Read without dereferencing, only the payment intent of the order is needed
+            order_id = refund.to_mongo()['order']
+            order = (await OrderRepository.find_raw_by_ids([order_id], {"payment_intent_id": 1})).get(order_id)
+
+            if not order:
+                return OrchestrationResult.failure(
+                        status_code=EnumResponseStatusCode.NOT_FOUND,
+                        message='Order does not exist.'
+                )
+
             refund_id = await StripeService.refund_client(
-                payment_intent_id=refund.order.payment_intent_id, 
-                amount_in_cents=int(round(refund.order.refunded_amount * 100))
+                payment_intent_id=order["payment_intent_id"], 
+                amount_in_cents=int(round(refund.refunded_amount * 100))
             )
             
             refund.status = EnumRefundStatus.CREATED.value
             refund.refund_id = refund_id
-            refund.save()
+            await RefundRepository.save(refund)
 
             return OrchestrationResult.success(
-                data=RefundResponseParser.parse(refund=refund), 
+                data=RefundResponseParser.parse(refund=(await Prefetch.refunds([refund]))[0]), 
                 message='Refunded successfully', 
                 status_code=EnumResponseStatusCode.REFUND_INITIATED
             )
@@ -302,7 +338,7 @@ class AdminService:
     @staticmethod
     async def get_refund(refund_id:str) -> OrchestrationResultType[RefundResponseModel]:
         try:
-            refund: Refund = Refund.objects(id=refund_id).first()
+            refund: Refund = await RefundRepository.find_one(id=refund_id)
 
             if not refund:
                 return OrchestrationResult.failure(
@@ -311,7 +347,7 @@ class AdminService:
                 )
 
             return OrchestrationResult.success(
-                data=RefundResponseParser.parse(refund=refund), 
+                data=RefundResponseParser.parse(refund=(await Prefetch.refunds([refund]))[0]), 
                 message='Recovered successfully', 
                 status_code=EnumResponseStatusCode.RECOVERED_SUCCESSFULLY
             )
@@ -320,21 +356,32 @@ class AdminService:
             return OrchestrationResult.server_error()
         
     @staticmethod
-    async def get_refunds(page:int, limit:int, status:EnumRefundStatus) -> OrchestrationResultType[RefundResponseModel]:
+    async def get_refunds(page:int, limit:int, status:EnumRefundStatus, after:Optional[str] = None, include_total:bool = True) -> OrchestrationResultType[RefundResponseModel]:
         try:
-            skip = (page - 1) * limit
-            total_items = Refund.objects(status=status.value).count()
-            total_pages = math.ceil(total_items / limit)
+            try:
+                cursor_query = CursorUtils.after_query(after) if after else Q()
+            except ValueError:
+                return OrchestrationResult.failure(
+                    status_code=EnumResponseStatusCode.INVALID_CURSOR,
+                    message='Invalid cursor.'
+                )
+
+            skip = 0 if after else (page - 1) * limit
+            total_items = await RefundRepository.count(status=status.value) if include_total else None
+            total_pages = math.ceil(total_items / limit) if include_total else None
 
-            refunds: Refund = Refund.objects(status=status.value).skip(skip).limit(limit)
+            refunds: list[dict] = await RefundRepository.find_raw(cursor_query, status=status.value, fields=REFUND_RESPONSE_FIELDS, skip=skip, limit=limit + 1, order_by=SORT_ORDER)
+            refunds, next_cursor = CursorUtils.next_page(refunds, limit)
+            refunds = await Prefetch.refunds(refunds)
 
             return OrchestrationResult.success(
                 data=RefundResponseParser.parse_paginated(
-                    refunds==refunds,
+                    refunds=refunds,
                     total_pages=total_pages,
                     limit=limit,
                     page=page,
-                    total_items=total_items
+                    total_items=total_items,
+                    next_cursor=next_cursor
                 ), 
                 message='Recovered successfully', 
                 status_code=EnumResponseStatusCode.RECOVERED_SUCCESSFULLY
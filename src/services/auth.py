@@ -1,19 +1,26 @@
 from models.address import Address
-from dto.request.user import CreateUserRequestDto, LoginUserRequestDto, UpdateUserRequestDto
+from dto.request.user import CreateUserRequestDto, LoginUserRequestDto, RefreshTokenRequestDto, UpdateUserRequestDto
 from dto.response.user import UserResponseModel, LoginResponseModel
 from dto.response.user import UserResponseParser
 from enums.response_codes import EnumResponseStatusCode
+from models.refresh_token import RefreshToken
 from models.user import User
+from repositories.refresh_token import RefreshTokenRepository
+from repositories.user import UserRepository
 from utils.orchestration_result import OrchestrationResult, OrchestrationResultType
-from utils.password_utils import PasswordUtils
+from utils.password_utils import PasswordPoolSaturatedError, PasswordUtils
 from utils.token_utils import TokenUtils
+from utils.user_cache import UserCache
 from utils_types.user_info_in_token import UserInfoInToken
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import uuid4
+from utils.config import refresh_token_duration_in_days
 class AuthService:
     @staticmethod
     async def create_account(data:CreateUserRequestDto) -> OrchestrationResultType[UserResponseModel]:
         try:
-            existing_user = User.objects(email=data.email).first()
+            existing_user = await UserRepository.find_one(email=data.email)
             if existing_user:
                 if existing_user.deleted == True:
                     return OrchestrationResult.failure(
@@ -27,14 +34,19 @@ class AuthService:
                     )
             
             user = User(**data.model_dump())
-            user.password = PasswordUtils.hash_password(data.password)
-            user.save()
+            user.password = await PasswordUtils.hash_password_async(data.password)
+            await UserRepository.save(user)
 
             return OrchestrationResult.success(
                 data=UserResponseParser.parse(user), 
                 message='Account created successfully', 
                 status_code=EnumResponseStatusCode.CREATED_SUCCESSFULLY
             )
+        except PasswordPoolSaturatedError:
+            return OrchestrationResult.failure(
+                status_code=EnumResponseStatusCode.TOO_MANY_REQUESTS,
+                message='Too many requests at the moment, please retry later.'
+            )
         except Exception as exc:
             print(exc)
             return OrchestrationResult.server_error()
@@ -42,7 +54,7 @@ class AuthService:
     @staticmethod
     async def login(data:LoginUserRequestDto) -> OrchestrationResultType[LoginResponseModel]:
         try:
-            found_user = User.objects(email=data.email).first()
+            found_user = await UserRepository.find_one(email=data.email)
 
             if not found_user:
                 return OrchestrationResult.unauthorized(
@@ -56,28 +68,103 @@ class AuthService:
                     message='You account has been deleted, please contact an admin to restore it. '
                 )
             
-            if not PasswordUtils.verify_password(plane_password=data.password, hashed_password=found_user.password):
+            if not await PasswordUtils.verify_password_async(plane_password=data.password, hashed_password=found_user.password):
                 return OrchestrationResult.failure(
                     status_code=EnumResponseStatusCode.INVALID_CREDENTIALS,
                     message='Invalid credentials'
                 )
             
             access_token = TokenUtils.create_access_token(user=found_user)
+            refresh_token = await AuthService.issue_refresh_token(user=found_user)
 
             return OrchestrationResult.success(
                 data=UserResponseParser.parse_logged_in_user(user=found_user,
-                access_token=access_token), 
+                access_token=access_token, refresh_token=refresh_token), 
                 message='Logged in successfully', 
                 status_code=EnumResponseStatusCode.RECOVERED_SUCCESSFULLY
             )
+        except PasswordPoolSaturatedError:
+            return OrchestrationResult.failure(
+                status_code=EnumResponseStatusCode.TOO_MANY_REQUESTS,
+                message='Too many requests at the moment, please retry later.'
+            )
+        except Exception as exc:
+            print(exc)
+            return OrchestrationResult.server_error()
+
+    @staticmethod
+    async def refresh_access_token(data:RefreshTokenRequestDto) -> OrchestrationResultType[LoginResponseModel]:
+        try:
+            token_hash = TokenUtils.hash_refresh_token(data.refresh_token)
+
+            # Revoking it right away means that a refresh token can only be used once
+            stored_token = await RefreshTokenRepository.consume(token_hash)
+
+            if stored_token is None:
+                # A token that was rotated already is being replayed, it may have been stolen so the whole login is revoked
+                reused_token = await RefreshTokenRepository.find_by_hash(token_hash)
+                if reused_token is not None and reused_token.get('revoked') == True:
+                    await RefreshTokenRepository.revoke_family(reused_token['family'])
+
+                return OrchestrationResult.unauthorized(
+                    status_code=EnumResponseStatusCode.INVALID_REFRESH_TOKEN,
+                    message='Invalid or expired refresh token'
+                )
+
+            user = await UserCache.get_active_user(str(stored_token['user']))
+
+            if not user:
+                return OrchestrationResult.unauthorized(
+                    status_code=EnumResponseStatusCode.NOT_FOUND,
+                    message='User does not exist'
+                )
+
+            access_token = TokenUtils.create_access_token(user=user)
+            refresh_token = await AuthService.issue_refresh_token(user=user, family=stored_token['family'])
+
+            return OrchestrationResult.success(
+                data=UserResponseParser.parse_logged_in_user(user=user,
+                access_token=access_token, refresh_token=refresh_token), 
+                message='Token refreshed successfully', 
+                status_code=EnumResponseStatusCode.RECOVERED_SUCCESSFULLY
+            )
+        except Exception as exc:
+            print(exc)
+            return OrchestrationResult.server_error()
+
+    @staticmethod
+    async def logout(data:RefreshTokenRequestDto) -> OrchestrationResultType[None]:
+        try:
+            stored_token = await RefreshTokenRepository.find_by_hash(TokenUtils.hash_refresh_token(data.refresh_token))
+
+            if stored_token is not None:
+                await RefreshTokenRepository.revoke_family(stored_token['family'])
+
+            return OrchestrationResult.success(
+                message='Logged out successfully', 
+                status_code=EnumResponseStatusCode.LOGGED_OUT_SUCCESSFULLY
+            )
         except Exception as exc:
             print(exc)
             return OrchestrationResult.server_error()
 
+    @staticmethod
+    async def issue_refresh_token(user:User, family:Optional[str] = None) -> str:
+        refresh_token = TokenUtils.create_refresh_token()
+
+        await RefreshTokenRepository.save(RefreshToken(
+            user=user,
+            token_hash=TokenUtils.hash_refresh_token(refresh_token),
+            family=family or uuid4().hex,
+            expires_at=datetime.utcnow() + timedelta(days=int(refresh_token_duration_in_days))
+        ))
+
+        return refresh_token
+
     @staticmethod
     async def get_profile(user_info:UserInfoInToken) -> OrchestrationResultType[UserResponseModel]:
         try:
-            found_user = User.objects(id=user_info.id, deleted=False).first()
+            found_user = user_info.user
 
             if not found_user:
                 return OrchestrationResult.unauthorized(
@@ -97,7 +184,7 @@ class AuthService:
     @staticmethod
     async def update_account(data:UpdateUserRequestDto, user_info:UserInfoInToken) -> OrchestrationResultType[UserResponseModel]:
         try:
-            user:User = User.objects(id=user_info.id, deleted=False).first()
+            user:User = user_info.user
 
             if not user:
                 return OrchestrationResult.unauthorized(
@@ -105,11 +192,14 @@ class AuthService:
                     message='User does not exist'
                 )
             
+            # The cached document is about to change
+            UserCache.invalidate(user.id)
+
             user.fullname = data.fullname or user.fullname
             user.address = Address(**data.address.model_dump()) if data.address else user.address
             user.updated_at = datetime.utcnow()
             
-            user.save()
+            await UserRepository.save(user)
 
             return OrchestrationResult.success(
                 data=UserResponseParser.parse(user), 
@@ -3,13 +3,14 @@
 from dto.response.category import CategoryResponseModel, CategoryResponseParser
 from enums.response_codes import EnumResponseStatusCode
 from models.category import Category
+from utils.category_cache import CategoryCache
 from utils.orchestration_result import OrchestrationResult, OrchestrationResultType
 
 class CategoryService:
     @staticmethod
     async def get_categories() -> OrchestrationResultType[list[CategoryResponseModel]]:
         try:
-            categories: list[Category] = Category.objects(deleted=False)
+            categories: list[Category] = await CategoryCache.get_categories()
 
             return OrchestrationResult.success(
                 data=CategoryResponseParser.parse_list(categories=categories), 
@@ -1,58 +1,82 @@
 from datetime import datetime, timedelta
 import math
+import scheduler
 from typing import Optional
-from dto.response.order import OrderResponseModel, OrderResponseParser
+from bson import ObjectId
+from dto.response.order import ORDER_RESPONSE_FIELDS, OrderResponseModel, OrderResponseParser
 from dto.response.paginated import Paginated
-from dto.response.refund import RefundResponseModel, RefundResponseParser
+from dto.response.refund import REFUND_RESPONSE_FIELDS, RefundResponseModel, RefundResponseParser
+from dto.response.user import USER_RESPONSE_FIELDS
 from enums.financial_line_status import EnumFinancialLineStatus
 from enums.order_status_enum import EnumOrderStatus
 from dto.request.order import CreateOrderDto
 from enums.refund_status import EnumRefundStatus
 from enums.response_codes import EnumResponseStatusCode
-from models.financial_line import FinancialLine
 from models.order import Order
 from models.ordered_product import OrderedProduct
-from models.product import Product
 from models.refund import Refund
-from models.user import User
+from repositories.base import run_in_transaction
+from repositories.financial_line import FinancialLineRepository
+from repositories.order import OrderRepository
+from repositories.product import ProductRepository
+from repositories.refund import RefundRepository
+from utils.cursor_utils import SORT_ORDER, CursorUtils
+from utils.prefetch import Prefetch
 from utils.orchestration_result import OrchestrationResult, OrchestrationResultType
 from utils_types.user_info_in_token import UserInfoInToken
-from mongoengine import get_db, Q
+from mongoengine import Q
+from pymongo.client_session import ClientSession
 from stripe.checkout import Session
+from .stock import InsufficientStockError, StockService
 from .stripe import StripeService
-from utils.config import refund_percentage, cancellation_paid_order_period_in_minutes
+from utils.config import refund_percentage, cancellation_paid_order_period_in_minutes, max_pending_or_failed_order_time_in_minutes
 
 class OrderService:
     @staticmethod
     async def create_order(user_info:UserInfoInToken, data:CreateOrderDto) -> OrchestrationResultType[OrderResponseModel]:
         try:
             # Get the client 
-            client = User.objects(id=user_info.id, deleted=False).first()
+            client = user_info.user
             if client is None:
                     return OrchestrationResult.failure(
                         status_code=EnumResponseStatusCode.NOT_FOUND,
                         message='Client does not exist.'
                     )
 
+            # Merge the lines that target the same product
+            requested_quantities: dict[ObjectId, int] = {}
+            for product in data.products:
+                if not ObjectId.is_valid(product.product_id):
+                    return OrchestrationResult.failure(
+                        status_code=EnumResponseStatusCode.PRODUCT_NOT_FOUND,
+                        message='Product does not exist.'
+                    )
+                product_id = ObjectId(product.product_id)
+                requested_quantities[product_id] = requested_quantities.get(product_id, 0) + product.quantity
+
+            # Load every product and the status of its seller at once
+            existing_products = await ProductRepository.find_active_with_seller_status(list(requested_quantities.keys()))
+
             # Build the ordered products list 
             ordered_products: list[OrderedProduct] = []
 
-            for product in data.products:
-                existing_product: Product = Product.objects(id=product.product_id, deleted=False).first()
-
-                if existing_product is None:
+            for product_id, quantity in requested_quantities.items():
+                if product_id not in existing_products:
                     return OrchestrationResult.failure(
                         status_code=EnumResponseStatusCode.PRODUCT_NOT_FOUND,
                         message='Product does not exist.'
                     )
                 
-                if (existing_product.quantity - product.quantity) < 0:
+                existing = existing_products[product_id]
+                existing_product = existing.product
+
+                if (existing_product.quantity - quantity) < 0:
                     return OrchestrationResult.failure(
                         status_code=EnumResponseStatusCode.PRODUCT_QUANTITY_MISMATCH,
                         message='Not enough product.'
                     )
                 
-                if existing_product.seller.deleted == True:
+                if existing.seller_deleted == True:
                     return OrchestrationResult.failure(
                         status_code=EnumResponseStatusCode.SELLER_NOT_FOUND,
                         message='Seller not found.'
@@ -61,40 +85,53 @@ class OrderService:
                 ordered_product = OrderedProduct(
                     product=existing_product,
                     price_at_order=existing_product.price,
-                    quantity=product.quantity
+                    quantity=quantity,
+                    name=existing_product.name,
+                    description=existing_product.description,
+                    seller_id=existing.seller_id,
+                    seller_name=existing.seller_name,
+                    category_id=existing.category_id,
+                    category_name=existing.category_name
                 )
 
                 ordered_products.append(ordered_product)
 
-            # Start a session and a transaction
-            with get_db().client.start_session() as session:
-                with session.start_transaction():
-                    # Calculate total
-                    total = sum(
-                        ordered_product.price_at_order * ordered_product.quantity 
-                        for ordered_product in ordered_products
-                    )
+            # Reserve the stock first, the conditional updates make sure that concurrent orders cannot oversell
+            try:
+                await StockService.reserve(requested_quantities)
+            except InsufficientStockError:
+                return OrchestrationResult.failure(
+                    status_code=EnumResponseStatusCode.PRODUCT_QUANTITY_MISMATCH,
+                    message='Not enough product.'
+                )
 
-                    # Create and save the order inside the transaction
-                    order = Order(
-                        products=ordered_products,
-                        client=client,
-                        status=EnumOrderStatus.PENDING.value,
-                        total=total
-                    )
-                    order.save(session=session)  # Use session-aware save
+            # Calculate total
+            total = sum(
+                ordered_product.price_at_order * ordered_product.quantity 
+                for ordered_product in ordered_products
+            )
 
-                    # Update product quantities inside the transaction
-                    for ordered_product in ordered_products:
-                        product: Product = Product.objects(id=ordered_product.product.id, deleted=False).first()
-                        product.quantity -= ordered_product.quantity
-                        product.save(session=session)  # Use session-aware save
+            order = Order(
+                products=ordered_products,
+                client=client,
+                status=EnumOrderStatus.PENDING.value,
+                total=total,
+                expires_at=datetime.utcnow() + timedelta(minutes=int(max_pending_or_failed_order_time_in_minutes))
+            )
+
+            try:
+                await OrderRepository.save(order)
+            except Exception:
+                await StockService.release(requested_quantities)
+                raise
+
+            scheduler.schedule_order_expiry(order.expires_at)
 
             # Get the checkout url 
-            checkout_session: Session = StripeService.create_checkout_session(order=order)
+            checkout_session: Session = await StripeService.create_checkout_session(order=order)
                 
             return OrchestrationResult.success(
-                data=OrderResponseParser.parse(order=order,url=checkout_session.url), 
+                data=OrderResponseParser.parse(order=(await Prefetch.orders([order]))[0], url=checkout_session.url), 
                 message='Order created successfully', 
                 status_code=EnumResponseStatusCode.CREATED_SUCCESSFULLY
             )
@@ -103,9 +140,9 @@ class OrderService:
             return OrchestrationResult.server_error()
         
     @staticmethod
-    async def get_my_orders(page:int, limit:int, user_info:UserInfoInToken, order_status:Optional[EnumOrderStatus]) -> OrchestrationResultType[Paginated[OrderResponseModel]]:
+    async def get_my_orders(page:int, limit:int, user_info:UserInfoInToken, order_status:Optional[EnumOrderStatus], after:Optional[str] = None, include_total:bool = True) -> OrchestrationResultType[Paginated[OrderResponseModel]]:
         try:
-            client = User.objects(id=user_info.id, deleted=False).first()
+            client = user_info.user
 
             if client is None:
                     return OrchestrationResult.failure(
@@ -113,16 +150,33 @@ class OrderService:
                         message='Client does not exist.'
                     )
 
-            filter_query = Q(deleted=False, client=client)
+            try:
+                cursor_match = CursorUtils.after_match(after) if after else {}
+            except ValueError:
+                return OrchestrationResult.failure(
+                    status_code=EnumResponseStatusCode.INVALID_CURSOR,
+                    message='Invalid cursor.'
+                )
+
+            match_query = {"deleted": False, "client": client.pk}
 
             if order_status is not None:
-                filter_query &= Q(status=order_status.value)
+                match_query["status"] = order_status.value
                 
-            skip = (page - 1) * limit
-            total_items = Order.objects(filter_query).count()
-            total_pages = math.ceil(total_items / limit)
-
-            orders: list[Order] = Order.objects(filter_query).skip(skip).limit(limit)
+            skip = 0 if after else (page - 1) * limit
+            total_items = await OrderRepository.count(__raw__=match_query) if include_total else None
+            total_pages = math.ceil(total_items / limit) if include_total else None
+
+            # Joined by the database, the parsers get complete documents and don't query anything
+            orders: list[dict] = await OrderRepository.find_joined(
+                match={**match_query, **cursor_match},
+                sort={"created_at": -1, "_id": -1},
+                skip=skip,
+                limit=limit + 1,
+                fields=ORDER_RESPONSE_FIELDS,
+                client_fields=USER_RESPONSE_FIELDS
+            )
+            orders, next_cursor = CursorUtils.next_page(orders, limit)
 
             return OrchestrationResult.success(
                 data=OrderResponseParser.parse_paginated(
@@ -130,7 +184,8 @@ class OrderService:
                     total_pages=total_pages,
                     limit=limit,
                     page=page,
-                    total_items=total_items
+                    total_items=total_items,
+                    next_cursor=next_cursor
                 ), 
                 message='Recovered successfully successfully', 
                 status_code=EnumResponseStatusCode.RECOVERED_SUCCESSFULLY
@@ -142,7 +197,7 @@ class OrderService:
     @staticmethod
     async def cancel_order(user_info:UserInfoInToken, order_id:str):
         try:
-            order: Order = Order.objects(id=order_id, client=user_info.id).first()
+            order: Order = await OrderRepository.find_one(id=order_id, client=user_info.id)
 
             if not order:
                 return OrchestrationResult.failure(
@@ -166,7 +221,7 @@ class OrderService:
     @staticmethod
     async def cancel_paid_order(user_info:UserInfoInToken, order_id:str):
         try:
-            order: Order = Order.objects(id=order_id, client=user_info.id).first()
+            order: Order = await OrderRepository.find_one(id=order_id, client=user_info.id)
 
             if not order:
                 return OrchestrationResult.failure(
@@ -197,11 +252,11 @@ class OrderService:
     async def retry_failed_payment(user_info:UserInfoInToken, order_id:str) -> OrchestrationResultType[OrderResponseModel]:
         try:
             # Get the order
-            order = Order.objects(
+            order = await OrderRepository.find_one(
                 id=order_id,
                 client=user_info.id,
                 deleted=False
-            ).first()
+            )
 
             if not order:
                 return OrchestrationResult.failure(
@@ -217,10 +272,10 @@ class OrderService:
             
 
             # Get the checkout url 
-            checkout_session: Session = StripeService.create_checkout_session(order=order)
+            checkout_session: Session = await StripeService.create_checkout_session(order=order)
                 
             return OrchestrationResult.success(
-                data=OrderResponseParser.parse(order=order,url=checkout_session.url), 
+                data=OrderResponseParser.parse(order=(await Prefetch.orders([order]))[0], url=checkout_session.url), 
                 message='Payment url created successfully', 
                 status_code=EnumResponseStatusCode.CREATED_SUCCESSFULLY
             )
@@ -229,9 +284,9 @@ class OrderService:
             return OrchestrationResult.server_error()
         
     @staticmethod
-    async def get_my_refunds(page:int, limit:int, user_info:UserInfoInToken, ) -> OrchestrationResultType[Paginated[RefundResponseModel]]:
+    async def get_my_refunds(page:int, limit:int, user_info:UserInfoInToken, after:Optional[str] = None, include_total:bool = True) -> OrchestrationResultType[Paginated[RefundResponseModel]]:
         try:
-            client = User.objects(id=user_info.id, deleted=False).first()
+            client = user_info.user
 
             if client is None:
                     return OrchestrationResult.failure(
@@ -239,13 +294,23 @@ class OrderService:
                         message='Client does not exist.'
                     )
 
+            try:
+                cursor_query = CursorUtils.after_query(after) if after else Q()
+            except ValueError:
+                return OrchestrationResult.failure(
+                    status_code=EnumResponseStatusCode.INVALID_CURSOR,
+                    message='Invalid cursor.'
+                )
+
             filter_query = Q(deleted=False, client=client)
                 
-            skip = (page - 1) * limit
-            total_items = Refund.objects(filter_query).count()
-            total_pages = math.ceil(total_items / limit)
+            skip = 0 if after else (page - 1) * limit
+            total_items = await RefundRepository.count(filter_query) if include_total else None
+            total_pages = math.ceil(total_items / limit) if include_total else None
 
-            refunds: list[Refund] = Refund.objects(filter_query).skip(skip).limit(limit)
+            refunds: list[dict] = await RefundRepository.find_raw(filter_query & cursor_query, fields=REFUND_RESPONSE_FIELDS, skip=skip, limit=limit + 1, order_by=SORT_ORDER)
+            refunds, next_cursor = CursorUtils.next_page(refunds, limit)
+            refunds = await Prefetch.refunds(refunds)
 
             return OrchestrationResult.success(
                 data=RefundResponseParser.parse_paginated(
@@ -253,7 +318,8 @@ class OrderService:
                     total_pages=total_pages,
                     limit=limit,
                     page=page,
-                    total_items=total_items
+                    total_items=total_items,
+                    next_cursor=next_cursor
                 ), 
                 message='Recovered successfully successfully', 
                 status_code=EnumResponseStatusCode.RECOVERED_SUCCESSFULLY
@@ -270,49 +336,65 @@ class OrderService:
     @staticmethod
     async def remove_order_completely_and_set_status(order:Order, status:EnumOrderStatus, unset_financial_lines:bool = False, initial_refund:bool = False) -> OrchestrationResultType[OrderResponseModel]:
         try:
-            ordered_products: list[OrderedProduct] = order.products
+            quantities = StockService.order_quantities([order])
+            previous_status = order.status
 
             refunded_amount = 0
             refund_id = None
 
             if initial_refund:
-                refund_percentage = float(refund_percentage)
                 refunded_amount = (float(refund_percentage) / 100) * order.total
                 refunded_amount_cents = int(round(refunded_amount * 100))
+                # Concurrent cancellations of the same order get the same refund, only the one
+                # that wins the status update below records it
                 refund_id = await StripeService.refund_client(
                     payment_intent_id=order.payment_intent_id, 
-                    amount_in_cents=refunded_amount_cents
+                    amount_in_cents=refunded_amount_cents,
+                    idempotency_key=f'cancel-paid-order-{order.pk}'
+                )
+
+            def remove_order(session:ClientSession) -> bool:
+                # Only the request that moves the order out of its current status gives the stock back
+                result = OrderRepository.collection().update_one(
+                    {"_id": order.pk, "status": previous_status},
+                    {"$set": {"status": status.value, "updated_at": datetime.utcnow()}},
+                    session=session
+                )
+                if result.modified_count == 0:
+                    return False
+
+                if unset_financial_lines:
+                    FinancialLineRepository.collection().update_many(
+                        {"order": order.pk},
+                        {"$set": {"status": EnumFinancialLineStatus.CANCELLED.value}},
+                        session=session
+                    )
+
+                if initial_refund and refund_id:
+                    refund = Refund(
+                        client=order.client,
+                        status=EnumRefundStatus.CREATED.value,
+                        order=order,
+                        original_amount=order.total,
+                        refunded_amount=refunded_amount,
+                        refund_id=refund_id
+                    )
+                    RefundRepository.insert_with_session(refund, session=session)
+
+                StockService.release_with_session(quantities, session=session)
+
+                return True
+
+            if not await run_in_transaction(remove_order):
+                return OrchestrationResult.failure(
+                    status_code=EnumResponseStatusCode.ORDER_STATUS_CHANGED,
+                    message='The status of this order changed in the meantime.'
                 )
 
-            with get_db().client.start_session() as session:
-                with session.start_transaction():
-                    if unset_financial_lines:
-                        financial_lines: list[FinancialLine] = FinancialLine.objects(order=order)
-                        for financial_line in financial_lines:
-                            financial_line.status = EnumFinancialLineStatus.CANCELLED.value
-                            financial_line.save(session=session)
-
-                    if initial_refund and refund_id:
-                        refund = Refund(
-                            client=order.client,
-                            status=EnumRefundStatus.CREATED.value,
-                            order=order,
-                            original_amount=order.total,
-                            refunded_amount=refunded_amount,
-                            refund_id=refund_id
-                        )
-                        refund.save(session=session)
-
-                    for ordered_product in ordered_products:
-                        product: Product = Product.objects(id=str(ordered_product.product.id)).first()
-                        product.quantity += ordered_product.quantity
-                        product.save(session=session)
-
-                    order.status = status.value
-                    order.save(session=session)
+            order.status = status.value
 
             return OrchestrationResult.success(
-                    data=OrderResponseParser.parse(order), 
+                    data=OrderResponseParser.parse((await Prefetch.orders([order]))[0]), 
                     message='Order cancelled successfully', 
                     status_code=EnumResponseStatusCode.CANCELLED_SUCCESSFULLY
                 )
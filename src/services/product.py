@@ -1,32 +1,42 @@
+import asyncio
 import json
 import math
 
 from bson import ObjectId
 from dto.request.product import CreateProductDto, UpdateProductDto
 from dto.response.paginated import Paginated
-from dto.response.product import ProductResponseModel, ProductResponseParser
+from dto.response.category import CATEGORY_RESPONSE_FIELDS
+from dto.response.product import PRODUCT_RESPONSE_FIELDS, ProductResponseModel, ProductResponseParser
+from dto.response.user import USER_RESPONSE_FIELDS
 from enums.response_codes import EnumResponseStatusCode
 from models.category import Category
 from models.product import Product
-from models.user import User
+from repositories.base import lookup_by_id, projection
+from repositories.product import ProductRepository
+from repositories.user import UserRepository
 from utils.orchestration_result import OrchestrationResult, OrchestrationResultType
 from utils_types.user_info_in_token import UserInfoInToken
 from datetime import datetime
+from typing import Optional
+from utils.category_cache import CategoryCache
+from utils.config import product_search_count_limit
+from utils.cursor_utils import CursorUtils
+from utils.prefetch import Prefetch
 from mongoengine import Q
 
 class ProductService:
     @staticmethod
     async def create_product(data:CreateProductDto, user_info:UserInfoInToken) -> OrchestrationResultType[ProductResponseModel]:
         try:
-            seller = User.objects(id=user_info.id, role=user_info.role, deleted=False).first()
+            seller = user_info.user
 
-            if not seller:
+            if not seller or seller.role != user_info.role:
                 return OrchestrationResult.unauthorized(
                     status_code=EnumResponseStatusCode.SELLER_NOT_FOUND,
                     message='Seller does not exist'
                 )
 
-            category = Category.objects(id=data.category_id, deleted=False).first()
+            category = await CategoryCache.get_category(data.category_id)
             
             if not category:
                 return OrchestrationResult.unauthorized(
@@ -42,7 +52,7 @@ class ProductService:
                 seller = seller,
                 category = category
             )
-            product.save()
+            await ProductRepository.save(product)
 
             return OrchestrationResult.success(
                 data=ProductResponseParser.parse(product), 
@@ -123,8 +133,27 @@ class ProductService:
         category_id: str,
         min_price: float,
         max_price: float,
+        estimate_total: bool = False,
+        after: Optional[str] = None,
+        include_total: bool = True,
+        q: Optional[str] = None,
     ) -> OrchestrationResultType[Paginated[ProductResponseModel]]:
         try:
+            # Results ranked by relevance have no stable key to resume from
+            if q and after:
+                return OrchestrationResult.failure(
+                    status_code=EnumResponseStatusCode.INVALID_CURSOR,
+                    message='Cursors cannot be used with a text search, use the page instead.'
+                )
+
+            try:
+                cursor_match = CursorUtils.after_match(after) if after else None
+            except ValueError:
+                return OrchestrationResult.failure(
+                    status_code=EnumResponseStatusCode.INVALID_CURSOR,
+                    message='Invalid cursor.'
+                )
+
             initial_match_query = {
                 "deleted": False,
             }
@@ -133,52 +162,53 @@ class ProductService:
             if category_id:
                 initial_match_query['category'] = ObjectId(category_id)
             if min_price:
-                initial_match_query['price'] = {"$gte": min_price}
+                initial_match_query.setdefault('price', {})["$gte"] = min_price
             if max_price:
-                initial_match_query['price'] = {"$lte":max_price}
+                initial_match_query.setdefault('price', {})["$lte"] = max_price
             if product_name:
                 initial_match_query['name'] = {
                     "$regex": product_name,
                     "$options": "i"
                 }
+            if q:
+                initial_match_query['$text'] = {"$search": q}
+
+            # The text search is ranked by relevance, every other search by creation date
+            if q:
+                sort_stage = {"$sort": {"score": {"$meta": "textScore"}, "_id": -1}}
+            else:
+                sort_stage = {"$sort": {"created_at": -1, "_id": -1}}
+
+            # Products of a deleted seller or category are hidden, checking it upfront keeps the joins out of the filtering
+            seller_deleted = seller_id and await UserRepository.count(id=seller_id, deleted=False) == 0
+            category_deleted = category_id and await CategoryCache.get_category(category_id) is None
+            if seller_deleted or category_deleted:
+                return OrchestrationResult.success(
+                    data=ProductResponseParser.parse_paginated(
+                        products=[],
+                        total_pages=0 if include_total else None,
+                        limit=limit,
+                        page=page,
+                        total_items=0 if include_total else None
+                    ), 
+                    message='Recovered successfully successfully', 
+                    status_code=EnumResponseStatusCode.RECOVERED_SUCCESSFULLY
+                )
 
-            deleted_match_query = {}
-            if seller_id:
-                deleted_match_query['seller.deleted'] = False
-            if category_id:
-                deleted_match_query['category.deleted'] = False
-
-            skip = (page - 1) * limit
+            skip = 0 if after else (page - 1) * limit
 
-            pipeline = [
-                {
-                    "$match": initial_match_query
-                },
-                {
-                    "$lookup": {
-                        "from": "category",
-                        "localField": "category",
-                        "foreignField": "_id",
-                        "as": "category"
-                    }
-                },
+            lookup_stages = [
+                lookup_by_id("category", "category", CATEGORY_RESPONSE_FIELDS, "category"),
                 {
                     "$unwind": "$category"
                 },
-                {
-                    "$lookup": {
-                        "from": "user",
-                        "localField": "seller",
-                        "foreignField": "_id",
-                        "as": "seller"
-                    }
-                },
+                lookup_by_id("user", "seller", USER_RESPONSE_FIELDS, "seller"),
                 {
                     "$unwind": "$seller"
-                },
-                {
-                    "$match": deleted_match_query
-                },
+                }
+            ]
+
+            format_stages = [
                 {
                     "$set": {
                         "category.id": { "$toString": "$category._id" },
@@ -191,27 +221,40 @@ class ProductService:
                 }
             ]
 
-            count_pipeline = pipeline.copy()
-            pipeline.extend(
-                [
-                    {
-                        "$skip": skip
-                    },
-                    {
-                        "$limit": limit
-                    }
-                ]
-            )
-            count_pipeline.append({"$count": "total"})
+            # Filtering and sorting happen on the product collection alone, only the page that is returned gets joined
+            # Only the fields of the response models are read, never the seller's password
+            # The cursor is part of the match and the sort can use the index
+            pipeline = [
+                {
+                    "$match": {"$and": [initial_match_query, cursor_match]} if cursor_match else initial_match_query
+                },
+                sort_stage,
+                {"$skip": skip},
+                {"$limit": limit + 1},
+                {"$project": projection(PRODUCT_RESPONSE_FIELDS)},
+                *lookup_stages,
+                *format_stages
+            ]
 
-            products: list[dict] = list(Product.objects.aggregate(*pipeline))
-            count_result = list(Product.objects.aggregate(*count_pipeline))
-            
-            print(f'pipeline {pipeline}')
-            print(f'count pipeline {count_pipeline}')
-            
-            total_items = count_result[0]["total"] if count_result else 0            
-            total_pages = math.ceil(total_items / limit)
+            if include_total:
+                # Counted apart from the page, past a certain size the count stops and only tells that there are at least that many products
+                count_limit = int(product_search_count_limit) if estimate_total else None
+
+                products, total_items = await asyncio.gather(
+                    ProductRepository.aggregate(pipeline),
+                    ProductRepository.count_raw(initial_match_query, limit=count_limit)
+                )
+                total_pages = math.ceil(total_items / limit)
+                total_is_estimated = estimate_total and total_items >= count_limit
+            else:
+                products: list[dict] = await ProductRepository.aggregate(pipeline)
+                total_items = None
+                total_pages = None
+                total_is_estimated = False
+
+            products, next_cursor = CursorUtils.next_page(products, limit)
+            if q:
+                next_cursor = None
 
             return OrchestrationResult.success(
                 data=ProductResponseParser.parse_paginated(
@@ -219,7 +262,9 @@ class ProductService:
                     total_pages=total_pages,
                     limit=limit,
                     page=page,
-                    total_items=total_items
+                    total_items=total_items,
+                    total_is_estimated=total_is_estimated,
+                    next_cursor=next_cursor
                 ), 
                 message='Recovered successfully successfully', 
                 status_code=EnumResponseStatusCode.RECOVERED_SUCCESSFULLY
@@ -231,14 +276,14 @@ class ProductService:
     @staticmethod
     async def delete_product(product_id:str, user_info:UserInfoInToken) -> OrchestrationResultType[ProductResponseModel]:
         try:
-            seller = User.objects(id=user_info.id, deleted=False).first()
+            seller = user_info.user
             if not seller:
                 return OrchestrationResult.unauthorized(
                     status_code=EnumResponseStatusCode.SELLER_NOT_FOUND,
                     message='Seller does not exist'
             )
             
-            product: Product = Product.objects(id=product_id, seller=seller).first()
+            product: Product = await ProductRepository.find_one(id=product_id, seller=seller)
 
             if product is None:
                 return OrchestrationResult.failure(
@@ -255,10 +300,10 @@ class ProductService:
             product.deleted = True
             product.deleted_at = datetime.utcnow()               
             
-            product.save()
+            await ProductRepository.save(product)
 
             return OrchestrationResult.success(
-                data=ProductResponseParser.parse(product), 
+                data=ProductResponseParser.parse((await Prefetch.products([product]))[0]), 
                 message='Product deleted successfully', 
                 status_code=EnumResponseStatusCode.DELETED_SUCCESSFULLY
             )
@@ -269,14 +314,14 @@ class ProductService:
     @staticmethod
     async def restore_product(product_id:str, user_info:UserInfoInToken) -> OrchestrationResultType[ProductResponseModel]:
         try:
-            seller = User.objects(id=user_info.id, deleted=False).first()
+            seller = user_info.user
             if not seller:
                 return OrchestrationResult.unauthorized(
                     status_code=EnumResponseStatusCode.SELLER_NOT_FOUND,
                     message='Seller does not exist'
             )
             
-            product: Product = Product.objects(id=product_id, seller=seller).first()
+            product: Product = await ProductRepository.find_one(id=product_id, seller=seller)
             if product is None:
                 return OrchestrationResult.failure(
                         status_code=EnumResponseStatusCode.NOT_FOUND,
@@ -292,10 +337,10 @@ class ProductService:
             product.deleted = False
             product.deleted_at = None               
             
-            product.save()
+            await ProductRepository.save(product)
 
             return OrchestrationResult.success(
-                data=ProductResponseParser.parse(product), 
+                data=ProductResponseParser.parse((await Prefetch.products([product]))[0]), 
                 message='Product deleted successfully', 
                 status_code=EnumResponseStatusCode.RESTORED_SUCCESSFULLY
             )
@@ -306,14 +351,14 @@ class ProductService:
     @staticmethod
     async def update_product(product_id:str, data:UpdateProductDto, user_info:UserInfoInToken) -> OrchestrationResultType[ProductResponseModel]:
         try:
-            seller = User.objects(id=user_info.id, deleted=False).first()
+            seller = user_info.user
             if not seller:
                 return OrchestrationResult.unauthorized(
                     status_code=EnumResponseStatusCode.SELLER_NOT_FOUND,
                     message='Seller does not exist'
             )
             
-            product: Product = Product.objects(id=product_id, seller=seller).first()
+            product: Product = await ProductRepository.find_one(id=product_id, seller=seller)
             if product is None:
                 return OrchestrationResult.failure(
                         status_code=EnumResponseStatusCode.NOT_FOUND,
@@ -333,7 +378,7 @@ class ProductService:
                 product.quantity = data.quantity
 
             if data.category_id is not None:
-                category: Category = Category.objects(id=data.category_id, deleted=False).first()
+                category: Category = await CategoryCache.get_category(data.category_id)
                 if not category:
                     return OrchestrationResult.failure(
                             status_code=EnumResponseStatusCode.NOT_FOUND,
@@ -342,10 +387,10 @@ class ProductService:
                 product.category = category
 
             product.updated_at = datetime.utcnow()               
-            product.save()
+            await ProductRepository.save(product)
 
             return OrchestrationResult.success(
-                data=ProductResponseParser.parse(product), 
+                data=ProductResponseParser.parse((await Prefetch.products([product]))[0]), 
                 message='Product updated successfully', 
                 status_code=EnumResponseStatusCode.UPDATED_SUCCESSFULLY
             )
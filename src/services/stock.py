@@ -0,0 +1,57 @@
+import asyncio
+from typing import Optional
+from bson import ObjectId
+from pymongo.client_session import ClientSession
+from models.order import Order
+from repositories.base import run_blocking
+from repositories.product import ProductRepository
+
+class InsufficientStockError(Exception):
+    pass
+
+class StockService:
+    @staticmethod
+    async def reserve(quantities:dict[ObjectId, int]) -> None:
+        """Takes the stock of every product or none of them, without reading the products first."""
+        product_ids = list(quantities.keys())
+
+        results: list[bool] = await asyncio.gather(*[
+            run_blocking(ProductRepository.take_stock, product_id, quantities[product_id])
+            for product_id in product_ids
+        ])
+
+        if all(results):
+            return
+
+        # Give back what was taken before telling the caller
+        reserved = {
+            product_id: quantities[product_id]
+            for product_id, taken in zip(product_ids, results) if taken
+        }
+        await StockService.release(reserved)
+
+        raise InsufficientStockError()
+
+    @staticmethod
+    async def release(quantities:dict[ObjectId, int]) -> None:
+        await run_blocking(ProductRepository.restore_stock, quantities)
+
+    @staticmethod
+    def release_with_session(quantities:dict[ObjectId, int], session:Optional[ClientSession]) -> None:
+        """Gives the stock back as part of the caller's transaction."""
+        ProductRepository.restore_stock(quantities, session=session)
+
+    @staticmethod
+    def order_quantities(orders:list[Order]) -> dict[ObjectId, int]:
+        """Sums the ordered quantity per product, without dereferencing the products."""
+        return StockService.raw_order_quantities([order.to_mongo() for order in orders])
+
+    @staticmethod
+    def raw_order_quantities(orders:list[dict]) -> dict[ObjectId, int]:
+        """Same as order_quantities, for orders read straight from the collection."""
+        quantities: dict[ObjectId, int] = {}
+        for order in orders:
+            for ordered_product in order.get("products", []):
+                product_id = ordered_product["product"]
+                quantities[product_id] = quantities.get(product_id, 0) + ordered_product["quantity"]
+        return quantities
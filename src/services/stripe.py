@@ -1,30 +1,50 @@
+from typing import Optional
+import httpx
 from stripe import stripe, Refund
 from stripe.checkout import Session
-from utils.config import stripe_secret_key
+from utils.config import (
+    stripe_api_base,
+    stripe_connect_timeout_in_seconds,
+    stripe_max_network_retries,
+    stripe_secret_key,
+    stripe_timeout_in_seconds
+)
 from models.order import Order
 
 stripe.api_key = stripe_secret_key
+stripe.max_network_retries = int(stripe_max_network_retries)
+
+# Can point to stripe-mock or any other fake server
+if stripe_api_base:
+    stripe.api_base = stripe_api_base
+
+# Shared by every call, the connections to Stripe are kept alive between requests
+stripe.default_http_client = stripe.HTTPXClient(
+    timeout=httpx.Timeout(float(stripe_timeout_in_seconds), connect=float(stripe_connect_timeout_in_seconds))
+)
 
 
 class StripeService:
     @staticmethod
-    def create_checkout_session(order:Order) -> Session:
-        products = order.products
+    async def create_checkout_session(order:Order) -> Session:
+        # Raw lines, reading the product reference of the document would load each product
+        products = order.to_mongo()['products']
 
+        # Named and described from the snapshot of the order, an order that was not backfilled yet falls back to the product id
         line_items = [
             {
                 'price_data': {
                     'currency': 'usd',
-                    'unit_amount': int(product.price_at_order * 100),  # amount in cents
+                    'unit_amount': int(product['price_at_order'] * 100),  # amount in cents
                     'product_data': {
-                        'name': f'{product.product.name}',
-                        'description': f'{product.product.description}',
+                        'name': product.get('name') or f'Product {product["product"]}',
+                        **({'description': product['description']} if product.get('description') else {}),
                     },
                 },
-                'quantity': product.quantity,
+                'quantity': product['quantity'],
             } for product in products]
 
-        checkout_session = stripe.checkout.Session.create(
+        checkout_session = await stripe.checkout.Session.create_async(
             payment_method_types=['card'],
             line_items=line_items,
             mode='payment',
@@ -41,12 +61,18 @@ class StripeService:
         return checkout_session
     
     @staticmethod
-    async def refund_client(payment_intent_id:str, amount_in_cents:float) -> str:
+    async def refund_client(payment_intent_id:str, amount_in_cents:float, idempotency_key:Optional[str] = None) -> str:
+        # Stripe returns the refund it already made for a key instead of refunding twice
         refund: Refund = await stripe.Refund.create_async(
             payment_intent=payment_intent_id,
-            amount=amount_in_cents
+            amount=amount_in_cents,
+            idempotency_key=idempotency_key
         )
 
         return refund.id
+
+    @staticmethod
+    async def close():
+        await stripe.default_http_client.close_async()
         
 # stripe listen --forward-to localhost:8000/assoh/api/v1/webhook 
\ No newline at end of file
@@ -1,17 +1,65 @@
-from mongoengine import get_db
+from typing import Callable
+from pymongo.client_session import ClientSession
+from pymongo.errors import DuplicateKeyError
+from enums.enum_stripe_event import EnumStripeEventType
 from enums.financial_line_status import EnumFinancialLineStatus
 from enums.order_status_enum import EnumOrderStatus
 from enums.refund_status import EnumRefundStatus
 from models.order import Order
-from models.ordered_product import OrderedProduct
 from models.financial_line import FinancialLine
+from models.processed_stripe_event import ProcessedStripeEvent
 from datetime import datetime
 
 from models.refund import Refund
+from repositories.base import run_in_transaction_sync
+from repositories.financial_line import FinancialLineRepository
+from repositories.order import OrderRepository
+from repositories.processed_stripe_event import ProcessedStripeEventRepository
+from repositories.product import ProductRepository
+from repositories.refund import RefundRepository
 
 class WebhookService:
     @staticmethod
-    def checkout_success(order_id:str, payment_intent_id:str):
+    def dispatch_event(event_id:str, event_type:str, data:dict):
+        """Applies a stored Stripe event, raises so that the consumer retries it."""
+        if event_type == EnumStripeEventType.CHECKOUT_SESSION_COMPLETED.value:
+            order_id = data.get('metadata', {}).get('order_id')
+            payment_intent_id = data.get('payment_intent')
+            WebhookService.checkout_success(event_id, order_id, payment_intent_id)
+
+        elif event_type == EnumStripeEventType.PAYMENT_INTENT_FAILED.value:
+            order_id = data.get('metadata', {}).get('order_id')
+            payment_intent_id = data.get('id')
+            WebhookService.payment_intent_failed(event_id, order_id=order_id, payment_intent_id=payment_intent_id)
+
+        elif event_type == EnumStripeEventType.REFUND_CREATED.value:
+            refund_id = data.get('id')
+            WebhookService.handle_refund_created(event_id, refund_id=refund_id)
+
+        elif event_type == EnumStripeEventType.REFUND_UPDATED.value:
+            refund_id = data.get('id')
+            status = data.get('status')
+            if status == 'succeeded':
+                WebhookService.handle_refund_succeeded(event_id, refund_id=refund_id)
+
+        elif event_type == EnumStripeEventType.REFUND_FAILED.value:
+            refund_id = data.get('id')
+            WebhookService.handle_refund_failed(event_id, refund_id=refund_id)
+
+    @staticmethod
+    def apply_once(event_id:str, event_type:str, callback:Callable[[ClientSession], None]):
+        """Runs callback in a transaction that also records the event, a duplicate is rejected by the unique index before any work."""
+        def apply(session:ClientSession):
+            ProcessedStripeEventRepository.insert_with_session(ProcessedStripeEvent(event_id=event_id, type=event_type), session)
+            callback(session)
+
+        try:
+            run_in_transaction_sync(apply)
+        except DuplicateKeyError:
+            print(f"Stripe event {event_id} was processed already")
+
+    @staticmethod
+    def checkout_success(event_id:str, order_id:str, payment_intent_id:str):
         if not order_id or not payment_intent_id:
             raise ValueError("Missing order_id or payment_intent_id")
 
@@ -20,36 +68,51 @@ class WebhookService:
         if order is None:
             raise ValueError("Order does not exist")
         
-        # Make this function more idempotent and make sure that the event is not treated twice. 
         if order.status != EnumOrderStatus.PENDING.value and order.status != EnumOrderStatus.PAYMENT_ERROR.value:
             return
         
-        products: list[OrderedProduct] = order.products
-
-        # Start a session and a transaction
-        with get_db().client.start_session() as session:
-            with session.start_transaction():
-                # Create a financial line for each product ordered
-                for product in products:
-                    financial_line = FinancialLine(
-                        seller=product.product.seller,
-                        product=product.product,
-                        status=EnumFinancialLineStatus.PENDING.value,
-                        price=product.price_at_order,
-                        quantity=product.quantity,
-                        order=order,
-                        total=product.price_at_order * product.quantity
-                    )
-                    financial_line.save(session=session)
-
-                # Update the order status
-                order.status = EnumOrderStatus.PAID.value
-                order.payment_intent_id = payment_intent_id
-                order.paid_at = datetime.utcnow()
-                order.save(session=session)
+        # Read without dereferencing, the sellers are loaded for all the products at once
+        ordered_products: list[dict] = order.to_mongo().get('products', [])
+        sellers = ProductRepository.find_sellers([ordered_product['product'] for ordered_product in ordered_products])
+
+        def pay_order(session:ClientSession):
+            now = datetime.utcnow()
+
+            # Only one transaction can move the order out of these statuses
+            paid = OrderRepository.collection().update_one(
+                {"_id": order.pk, "status": {"$in": [EnumOrderStatus.PENDING.value, EnumOrderStatus.PAYMENT_ERROR.value]}},
+                {"$set": {
+                    "status": EnumOrderStatus.PAID.value,
+                    "payment_intent_id": payment_intent_id,
+                    "paid_at": now,
+                    "updated_at": now
+                }},
+                session=session
+            )
+
+            if paid.modified_count == 0:
+                return
+
+            # Create a financial line for each product ordered
+            financial_lines = [
+                FinancialLine(
+                    seller=sellers[ordered_product['product']],
+                    product=ordered_product['product'],
+                    status=EnumFinancialLineStatus.PENDING.value,
+                    price=ordered_product['price_at_order'],
+                    quantity=ordered_product['quantity'],
+                    order=order.pk,
+                    total=ordered_product['price_at_order'] * ordered_product['quantity'],
+                    created_at=now
+                )
+                for ordered_product in ordered_products
+            ]
+            FinancialLineRepository.insert_many_with_session(financial_lines, session)
+
+        WebhookService.apply_once(event_id, EnumStripeEventType.CHECKOUT_SESSION_COMPLETED.value, pay_order)
 
     @staticmethod
-    def payment_intent_failed(order_id:str, payment_intent_id:str):
+    def payment_intent_failed(event_id:str, order_id:str, payment_intent_id:str):
         if not order_id or not payment_intent_id:
             raise ValueError("Missing order_id or payment_intent_id")
 
@@ -58,70 +121,70 @@ class WebhookService:
         if order is None:
             raise ValueError("Order does not exist")
         
-        # Make this function more idempotent and make sure that the event is not treated twice. 
         if order.status != EnumOrderStatus.PENDING.value and order.status != EnumOrderStatus.PAYMENT_ERROR.value:
             return
-        
-        order.payment_intent_id = payment_intent_id
-        order.status = EnumOrderStatus.PAYMENT_ERROR.value
-        order.updated_at = datetime.utcnow()
-        order.save()
 
-    @staticmethod
-    def handle_refund_created(refund_id:str):
-        if not refund_id:
-            raise ValueError("Missing refund_id or payment_intent_id")
+        def fail_order(session:ClientSession):
+            OrderRepository.collection().update_one(
+                {"_id": order.pk, "status": {"$in": [EnumOrderStatus.PENDING.value, EnumOrderStatus.PAYMENT_ERROR.value]}},
+                {"$set": {
+                    "status": EnumOrderStatus.PAYMENT_ERROR.value,
+                    "payment_intent_id": payment_intent_id,
+                    "updated_at": datetime.utcnow()
+                }},
+                session=session
+            )
 
-        refund: Refund = Refund.objects(refund_id=refund_id, deleted=False).first()
-
-        if refund is None:
-            raise ValueError("Refund does not exist")
-        
-        # Make this function more idempotent and make sure that the event is not treated twice. 
-        if refund.status != EnumRefundStatus.CREATED.value:
-            return
-        
-        refund.status = EnumRefundStatus.INITIATED.value 
-        refund.save()
+        WebhookService.apply_once(event_id, EnumStripeEventType.PAYMENT_INTENT_FAILED.value, fail_order)
 
     @staticmethod
-    def handle_refund_succeeded(refund_id:str):
-        if not refund_id:
-            raise ValueError("Missing refund_id or payment_intent_id")
+    def handle_refund_created(event_id:str, refund_id:str):
+        WebhookService.update_refund_status(
+            event_id,
+            EnumStripeEventType.REFUND_CREATED.value,
+            refund_id=refund_id,
+            from_status=EnumRefundStatus.CREATED,
+            to_status=EnumRefundStatus.INITIATED
+        )
 
-        refund: Refund = Refund.objects(refund_id=refund_id, deleted=False).first()
+    @staticmethod
+    def handle_refund_succeeded(event_id:str, refund_id:str):
+        WebhookService.update_refund_status(
+            event_id,
+            EnumStripeEventType.REFUND_UPDATED.value,
+            refund_id=refund_id,
+            from_status=EnumRefundStatus.INITIATED,
+            to_status=EnumRefundStatus.SUCCESS
+        )
 
-        if refund is None:
-            raise ValueError("Refund does not exist")
-        
-        # Make this function more idempotent and make sure that the event is not treated twice. 
-        if refund.status != EnumRefundStatus.INITIATED.value:
-            return
-        
-        refund.status = EnumRefundStatus.SUCCESS.value
-        refund.save() 
+    @staticmethod
+    def handle_refund_failed(event_id:str, refund_id:str):
+        WebhookService.update_refund_status(
+            event_id,
+            EnumStripeEventType.REFUND_FAILED.value,
+            refund_id=refund_id,
+            from_status=EnumRefundStatus.INITIATED,
+            to_status=EnumRefundStatus.FAILED
+        )
 
     @staticmethod
-    def handle_refund_failed(refund_id:str):
+    def update_refund_status(event_id:str, event_type:str, refund_id:str, from_status:EnumRefundStatus, to_status:EnumRefundStatus):
         if not refund_id:
-            raise ValueError("Missing refund_id or payment_intent_id")
+            raise ValueError("Missing refund_id")
 
         refund: Refund = Refund.objects(refund_id=refund_id, deleted=False).first()
 
         if refund is None:
             raise ValueError("Refund does not exist")
         
-        # Make this function more idempotent and make sure that the event is not treated twice. 
-        if refund.status != EnumRefundStatus.INITIATED.value:
+        if refund.status != from_status.value:
             return
-        
-        refund.status = EnumRefundStatus.FAILED.value
-        refund.save()
-            
 
+        def update_refund(session:ClientSession):
+            RefundRepository.collection().update_one(
+                {"_id": refund.pk, "status": from_status.value},
+                {"$set": {"status": to_status.value, "updated_at": datetime.utcnow()}},
+                session=session
+            )
 
-        
-        
-
-        
-        
+        WebhookService.apply_once(event_id, event_type, update_refund)
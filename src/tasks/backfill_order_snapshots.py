@@ -0,0 +1,85 @@
+import asyncio
+import time
+from typing import Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from mongoengine import connect, disconnect
+from repositories.base import run_blocking
+from repositories.category import CategoryRepository
+from repositories.order import OrderRepository
+from repositories.product import ProductRepository
+from repositories.user import UserRepository
+from utils.config import database_name, database_host, migration_batch_size
+
+async def backfill_batch(after_id:Optional[ObjectId], batch_size:int) -> tuple[int, Optional[ObjectId]]:
+    """Writes the snapshot of the ordered products of up to batch_size orders, returns their count and the last _id."""
+    query = {"$or": [{"products.name": {"$exists": False}}, {"products.description": {"$exists": False}}]}
+    if after_id is not None:
+        query["_id"] = {"$gt": after_id}
+
+    orders = await run_blocking(
+        lambda: list(OrderRepository.collection().find(query, {"products": 1}).sort("_id", 1).limit(batch_size))
+    )
+
+    if not orders:
+        return 0, after_id
+
+    product_ids = {ordered_product["product"] for order in orders for ordered_product in order.get("products", [])}
+    products = await ProductRepository.find_raw_by_ids(product_ids, {"name": 1, "description": 1, "seller": 1, "category": 1})
+
+    sellers, categories = await asyncio.gather(
+        UserRepository.find_raw_by_ids({product["seller"] for product in products.values()}, {"fullname": 1}),
+        CategoryRepository.find_raw_by_ids({product["category"] for product in products.values()}, {"name": 1})
+    )
+
+    operations = []
+    for order in orders:
+        ordered_products = []
+        for ordered_product in order.get("products", []):
+            product = products.get(ordered_product["product"], {})
+            seller = sellers.get(product.get("seller"), {})
+            category = categories.get(product.get("category"), {})
+
+            # Only fills what is missing, a snapshot taken at order time is kept
+            ordered_products.append({
+                "name": product.get("name"),
+                "description": product.get("description"),
+                "seller_id": product.get("seller"),
+                "seller_name": seller.get("fullname"),
+                "category_id": product.get("category"),
+                "category_name": category.get("name"),
+                **ordered_product
+            })
+
+        operations.append(UpdateOne({"_id": order["_id"]}, {"$set": {"products": ordered_products}}))
+
+    await run_blocking(OrderRepository.collection().bulk_write, operations, ordered=False)
+
+    return len(orders), orders[-1]["_id"]
+
+async def backfill_order_snapshots() -> dict:
+    started_at = time.monotonic()
+    batch_size = int(migration_batch_size)
+    report = {"orders": 0, "batches": 0}
+
+    # Walks the _id index forward, so an order whose product was removed is not picked up again
+    last_id = None
+    while True:
+        count, last_id = await backfill_batch(last_id, batch_size)
+        if count == 0:
+            break
+
+        report["orders"] += count
+        report["batches"] += 1
+        print(f"Backfilled {report['orders']} orders")
+
+    report["duration_in_seconds"] = round(time.monotonic() - started_at, 3)
+    print(f"Backfill of order snapshots: {report}")
+
+    return report
+
+# One-off migration for the orders created before the snapshot existed: python -m tasks.backfill_order_snapshots
+if __name__ == '__main__':
+    connect(db=database_name, host=database_host)
+    asyncio.run(backfill_order_snapshots())
+    disconnect()
@@ -1,13 +1,89 @@
+import time
 from datetime import datetime, timedelta
+from pymongo.client_session import ClientSession
+from pymongo.errors import PyMongoError
 from enums.order_status_enum import EnumOrderStatus
-from models.order import Order
-from services.order import OrderService
-from utils.config import max_pending_or_failed_order_time_in_minutes
+from repositories.base import run_in_transaction
+from repositories.order import OrderRepository
+from repositories.product import ProductRepository
+from services.stock import StockService
+from utils.config import cleanup_batch_size, max_pending_or_failed_order_time_in_minutes
 
-async def cleanup_pending_orders():
-    orders: list[Order] = Order.objects(status__in=[EnumOrderStatus.PENDING.value, EnumOrderStatus.PAYMENT_ERROR.value])
-    
-    for order in orders:
-        if datetime.utcnow() - order.created_at > timedelta(minutes=int(max_pending_or_failed_order_time_in_minutes)):
-            await OrderService.remove_order_completely_and_set_status(order=order, status=EnumOrderStatus.CANCELLED_AUTOMATICALLY)
+EXPIRABLE_STATUSES = [EnumOrderStatus.PENDING.value, EnumOrderStatus.PAYMENT_ERROR.value]
 
+# A batch whose transaction conflicts with a payment or another cancellation is read and run again
+TRANSACTION_ATTEMPTS = 3
+
+def cancel_expired_batch(now:datetime, cutoff:datetime, batch_size:int, session:ClientSession) -> tuple[int, int]:
+    """Cancels up to batch_size expired orders and gives their stock back with one $inc per product."""
+    # Read in the transaction, an order paid in the meantime makes the transaction fail instead of being cancelled
+    orders = list(
+        OrderRepository.collection().find(
+            {
+                "status": {"$in": EXPIRABLE_STATUSES},
+                "$or": [
+                    {"expires_at": {"$lte": now}},
+                    # Orders created before expires_at existed
+                    {"expires_at": None, "created_at": {"$lt": cutoff}}
+                ]
+            },
+            {"products": 1},
+            session=session
+        ).limit(batch_size)
+    )
+
+    if not orders:
+        return 0, 0
+
+    OrderRepository.collection().update_many(
+        # Never overwrite an order that left these statuses, even outside a transaction
+        {"_id": {"$in": [order["_id"] for order in orders]}, "status": {"$in": EXPIRABLE_STATUSES}},
+        {"$set": {"status": EnumOrderStatus.CANCELLED_AUTOMATICALLY.value, "updated_at": datetime.utcnow()}},
+        session=session
+    )
+
+    quantities = StockService.raw_order_quantities(orders)
+    ProductRepository.restore_stock(quantities, session=session)
+
+    return len(orders), len(quantities)
+
+async def cancel_expired_batch_with_retries(now:datetime, cutoff:datetime, batch_size:int) -> tuple[int, int]:
+    for attempt in range(1, TRANSACTION_ATTEMPTS + 1):
+        try:
+            return await run_in_transaction(lambda session: cancel_expired_batch(now, cutoff, batch_size, session))
+        except PyMongoError as exc:
+            if attempt == TRANSACTION_ATTEMPTS or not exc.has_error_label("TransientTransactionError"):
+                raise
+
+            print(f"Retrying a batch of expired orders after a transient error: {exc}")
+
+async def cleanup_pending_orders() -> dict:
+    started_at = time.monotonic()
+    now = datetime.utcnow()
+    cutoff = now - timedelta(minutes=int(max_pending_or_failed_order_time_in_minutes))
+    batch_size = int(cleanup_batch_size)
+
+    report = {"cancelled_orders": 0, "restored_products": 0, "batches": 0, "failed": False}
+
+    try:
+        while True:
+            cancelled_orders, restored_products = await cancel_expired_batch_with_retries(now, cutoff, batch_size)
+
+            if cancelled_orders == 0:
+                break
+
+            report["cancelled_orders"] += cancelled_orders
+            report["restored_products"] += restored_products
+            report["batches"] += 1
+
+            if cancelled_orders < batch_size:
+                break
+    except Exception as exc:
+        # What is left is picked up by the next run
+        print(f"Failed to cleanup pending orders: {exc}")
+        report["failed"] = True
+
+    report["duration_in_seconds"] = round(time.monotonic() - started_at, 3)
+    print(f"Cleanup of pending orders: {report}")
+
+    return report
@@ -0,0 +1,48 @@
+from mongoengine import connect, disconnect
+from models.category import Category
+from models.financial_line import FinancialLine
+from models.order import Order
+from models.processed_stripe_event import ProcessedStripeEvent
+from models.product import Product
+from models.refresh_token import RefreshToken
+from models.refund import Refund
+from models.scheduler_lock import SchedulerLock
+from models.stripe_event import StripeEvent
+from models.user import User
+from repositories.base import run_blocking
+from utils.config import database_name, database_host
+
+MODELS = [User, Category, Product, Order, Refund, FinancialLine, RefreshToken, StripeEvent, ProcessedStripeEvent, SchedulerLock]
+
+class IndexCreationError(Exception):
+    """Raised when the indexes of some collections could not be created, after trying every collection."""
+
+    def __init__(self, failures:dict[str, Exception]):
+        super().__init__('Failed to ensure the indexes of ' + ', '.join(f'{name} ({exc})' for name, exc in failures.items()))
+        self.failures = failures
+
+def ensure_indexes_sync():
+    # create_index is a no-op for the indexes that exist already, so this can run on every startup.
+    # Each collection is indexed on its own, one failing index doesn't leave the next collections without theirs.
+    failures: dict[str, Exception] = {}
+    for model in MODELS:
+        try:
+            model.ensure_indexes()
+            print(f'Indexes ensured for {model._get_collection_name()}')
+        except Exception as exc:
+            print(f'Failed to ensure the indexes of {model._get_collection_name()}: {exc}')
+            failures[model._get_collection_name()] = exc
+
+    # The unique indexes are what makes the scheduler lock and the Stripe event deduplication safe,
+    # the service must not run without them
+    if failures:
+        raise IndexCreationError(failures)
+
+async def ensure_indexes():
+    await run_blocking(ensure_indexes_sync)
+
+# Can also be run on its own before a deployment: python -m tasks.ensure_indexes
+if __name__ == '__main__':
+    connect(db=database_name, host=database_host)
+    ensure_indexes_sync()
+    disconnect()
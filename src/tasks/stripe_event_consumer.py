@@ -0,0 +1,89 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+from repositories.base import run_blocking
+from repositories.stripe_event import StripeEventRepository
+from services.webhook import WebhookService
+from utils.config import (
+    stripe_event_concurrency,
+    stripe_event_lock_timeout_in_seconds,
+    stripe_event_max_attempts,
+    stripe_event_poll_interval_in_seconds,
+    stripe_event_retry_delay_in_seconds
+)
+
+# Drains the stripe_event collection filled by the webhook. At most STRIPE_EVENT_CONCURRENCY
+# events are processed at a time, a failed event is retried with an exponential backoff and
+# is moved to the dead letters after STRIPE_EVENT_MAX_ATTEMPTS attempts.
+class StripeEventConsumer:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wake_up = asyncio.Event()
+        self._in_flight: set[asyncio.Task] = set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        # The handlers run in the threadpool and can't be interrupted, let them finish
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def notify(self):
+        """Called by the webhook so that a new event doesn't wait for the next poll."""
+        self._wake_up.set()
+
+    async def _run(self):
+        semaphore = asyncio.Semaphore(int(stripe_event_concurrency))
+
+        while True:
+            await semaphore.acquire()
+            self._wake_up.clear()
+
+            try:
+                event = await StripeEventRepository.claim_next(int(stripe_event_lock_timeout_in_seconds))
+            except Exception as exc:
+                print(f"Failed to claim a Stripe event: {exc}")
+                event = None
+
+            if event is None:
+                semaphore.release()
+                await self._wait()
+                continue
+
+            task = asyncio.create_task(self._process(event))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+            task.add_done_callback(lambda _: semaphore.release())
+
+    async def _wait(self):
+        try:
+            await asyncio.wait_for(self._wake_up.wait(), timeout=int(stripe_event_poll_interval_in_seconds))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _process(self, event:dict):
+        try:
+            await run_blocking(WebhookService.dispatch_event, event['event_id'], event['type'], json.loads(event['payload']))
+            await StripeEventRepository.mark_processed(event['_id'])
+        except Exception as exc:
+            print(f"Error handling Stripe event {event['event_id']}: {exc}")
+
+            attempts = event['attempts']
+            next_attempt_at = None
+            if attempts < int(stripe_event_max_attempts):
+                delay = int(stripe_event_retry_delay_in_seconds) * 2 ** (attempts - 1)
+                next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+            try:
+                await StripeEventRepository.mark_failed(event['_id'], error=str(exc), next_attempt_at=next_attempt_at)
+            except Exception as exc:
+                # The lock expires and the event is claimed again
+                print(f"Failed to record the failure of Stripe event {event['event_id']}: {exc}")
+
+stripe_event_consumer = StripeEventConsumer()
@@ -0,0 +1,61 @@
+import time
+from typing import Optional
+from models.category import Category
+from repositories.category import CategoryRepository
+from utils.config import category_cache_ttl_in_seconds
+
+# Categories only change through the admin service, which refreshes this cache.
+# The TTL bounds how long the other workers keep serving a stale list.
+class CategoryCache:
+    _categories: list[Category] = []
+    _by_id: dict[str, Category] = {}
+    _loaded_at: Optional[float] = None
+
+    hits = 0
+    misses = 0
+
+    @classmethod
+    async def refresh(cls) -> None:
+        categories: list[Category] = await CategoryRepository.find(deleted=False)
+        cls._categories = categories
+        cls._by_id = {str(category.id): category for category in categories}
+        cls._loaded_at = time.monotonic()
+
+    @classmethod
+    def invalidate(cls) -> None:
+        cls._loaded_at = None
+
+    @classmethod
+    async def _ensure_fresh(cls) -> None:
+        if cls._loaded_at is not None and time.monotonic() - cls._loaded_at < int(category_cache_ttl_in_seconds):
+            cls.hits += 1
+            return
+
+        cls.misses += 1
+        await cls.refresh()
+
+    @classmethod
+    async def get_categories(cls) -> list[Category]:
+        await cls._ensure_fresh()
+        return cls._categories
+
+    @classmethod
+    async def get_category(cls, category_id:str) -> Optional[Category]:
+        """Returns the category if it exists and is not deleted."""
+        await cls._ensure_fresh()
+
+        category = cls._by_id.get(str(category_id))
+        if category is not None:
+            return category
+
+        # Could have been created by another worker since the last refresh
+        cls.misses += 1
+        return await CategoryRepository.find_one(id=category_id, deleted=False)
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "hits": cls.hits,
+            "misses": cls.misses,
+            "size": len(cls._categories),
+        }
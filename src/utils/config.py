@@ -11,13 +11,34 @@ database_host = os.getenv("DATABASE_HOST")
 
 access_token_secret_key = os.getenv("ACCESS_TOKEN_SECRET_KEY")
 access_token_duration_in_minutes = os.getenv("ACCESS_TOKEN_DURATION_IN_MINUTES")
+token_cache_max_size = os.getenv('TOKEN_CACHE_MAX_SIZE', '10000')
+token_cache_ttl_in_seconds = os.getenv('TOKEN_CACHE_TTL_IN_SECONDS', '3600')
+refresh_token_duration_in_days = os.getenv('REFRESH_TOKEN_DURATION_IN_DAYS', '30')
 stripe_secret_key = os.getenv('STRIPE_SECRET_KEY')
 stripe_webhook_key = os.getenv('STRIPE_WEBHOOK_KEY')
+stripe_api_base = os.getenv('STRIPE_API_BASE')
+stripe_timeout_in_seconds = os.getenv('STRIPE_TIMEOUT_IN_SECONDS', '10')
+stripe_connect_timeout_in_seconds = os.getenv('STRIPE_CONNECT_TIMEOUT_IN_SECONDS', '3')
+stripe_max_network_retries = os.getenv('STRIPE_MAX_NETWORK_RETRIES', '2')
+stripe_event_concurrency = os.getenv('STRIPE_EVENT_CONCURRENCY', '4')
+stripe_event_max_attempts = os.getenv('STRIPE_EVENT_MAX_ATTEMPTS', '8')
+stripe_event_retry_delay_in_seconds = os.getenv('STRIPE_EVENT_RETRY_DELAY_IN_SECONDS', '5')
+stripe_event_poll_interval_in_seconds = os.getenv('STRIPE_EVENT_POLL_INTERVAL_IN_SECONDS', '5')
+stripe_event_lock_timeout_in_seconds = os.getenv('STRIPE_EVENT_LOCK_TIMEOUT_IN_SECONDS', '300')
 
 refund_percentage = os.getenv('REFUND_PERCENTAGE')
 cancellation_paid_order_period_in_minutes = os.getenv('CANCELLATION_PAID_ORDER_PERIOD_IN_MINUTES')
 cron_job_minutes_interval = os.getenv('CRON_JOB_MINUTES_INTERVAL')
+scheduler_lock_lease_in_seconds = os.getenv('SCHEDULER_LOCK_LEASE_IN_SECONDS', '60')
 max_pending_or_failed_order_time_in_minutes = os.getenv('MAX_PENDING_OR_FAILED_ORDER_TIME_IN_MINUTES')
+cleanup_batch_size = os.getenv('CLEANUP_BATCH_SIZE', '500')
+migration_batch_size = os.getenv('MIGRATION_BATCH_SIZE', '500')
+product_search_count_limit = os.getenv('PRODUCT_SEARCH_COUNT_LIMIT', '10000')
+category_cache_ttl_in_seconds = os.getenv('CATEGORY_CACHE_TTL_IN_SECONDS', '60')
+user_cache_max_size = os.getenv('USER_CACHE_MAX_SIZE', '10000')
+user_cache_ttl_in_seconds = os.getenv('USER_CACHE_TTL_IN_SECONDS', '30')
+password_hashing_workers = os.getenv('PASSWORD_HASHING_WORKERS', '4')
+password_hashing_queue_limit = os.getenv('PASSWORD_HASHING_QUEUE_LIMIT', '64')
 
 algorithm = os.getenv("ALGORITHM")
 
@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional
+from bson import ObjectId
+from mongoengine import Q
+
+# Listings are sorted by (created_at, _id) descending, a cursor is the sort key of the last item of a page.
+SORT_ORDER = ['-created_at', '-id']
+
+class CursorUtils:
+    @staticmethod
+    def encode(created_at:datetime, id:ObjectId) -> str:
+        data = json.dumps({"created_at": created_at.isoformat(), "id": str(id)})
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    @staticmethod
+    def decode(cursor:str) -> tuple[datetime, ObjectId]:
+        """Raises a ValueError when the cursor was not produced by encode."""
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(data["created_at"]), ObjectId(data["id"])
+        except Exception as exc:
+            raise ValueError("Invalid cursor") from exc
+
+    @staticmethod
+    def after_query(cursor:str) -> Q:
+        created_at, id = CursorUtils.decode(cursor)
+        return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=id)
+
+    @staticmethod
+    def after_match(cursor:str) -> dict:
+        created_at, id = CursorUtils.decode(cursor)
+        return {
+            "$or": [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": id}}
+            ]
+        }
+
+    @staticmethod
+    def next_page(items:list[Any], limit:int) -> tuple[list[Any], Optional[str]]:
+        """Takes limit + 1 items and returns the page with the cursor of the next one, if there is one."""
+        if len(items) <= limit:
+            return items, None
+
+        items = items[:limit]
+        last = items[-1]
+
+        if isinstance(last, dict):
+            return items, CursorUtils.encode(last["created_at"], last.get("_id") or ObjectId(last["id"]))
+
+        return items, CursorUtils.encode(last.created_at, last.pk)
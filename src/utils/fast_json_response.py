@@ -0,0 +1,20 @@
+from typing import Any
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic_core import to_jsonable_python
+
+class FastJSONResponse(JSONResponse):
+    """
+    Encodes with orjson, the response models are converted by pydantic_core.
+    A route that returns it directly skips the validation against its response_model, which
+    is only worth it when the data is already made of the response models, as the parsers do.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=to_jsonable_python)
+
+    @staticmethod
+    def from_result(result: dict, response: Response, default_status_code: int) -> "FastJSONResponse":
+        """Keeps the status code set on the route's response, the way returning the result would."""
+        return FastJSONResponse(content=result, status_code=response.status_code or default_status_code)
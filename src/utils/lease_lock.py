@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime, timedelta
+import os
+import socket
+from functools import wraps
+from typing import Any, Awaitable, Callable, Optional
+from uuid import uuid4
+from repositories.scheduler_lock import SchedulerLockRepository
+from utils.config import scheduler_lock_lease_in_seconds
+
+class LeaseHeldError(Exception):
+    """Raised instead of running a job whose lease is held by another instance."""
+
+    def __init__(self, name:str, held_until:Optional[datetime]):
+        super().__init__(f'{name} is held by another instance until {held_until}')
+        self.name = name
+        self.held_until = held_until
+
+# Every worker runs its own scheduler, the lease makes sure only one of them runs a job per tick.
+# SCHEDULER_LOCK_LEASE_IN_SECONDS must be shorter than the interval of the jobs it guards.
+class LeaseLock:
+    owner = f'{socket.gethostname()}:{os.getpid()}:{uuid4().hex}'
+
+    acquired: dict[str, int] = {}
+    skipped: dict[str, int] = {}
+
+    @staticmethod
+    def guard(name:str, job:Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        """Wraps a scheduled job so that it raises LeaseHeldError when another instance holds its lease."""
+        @wraps(job)
+        async def guarded_job():
+            lease_in_seconds = int(scheduler_lock_lease_in_seconds)
+            # Held for at least one lease even when the job is quick, the other instances fire
+            # on the same tick a little later and must not find the lock free again.
+            held_until = datetime.utcnow() + timedelta(seconds=lease_in_seconds)
+
+            if not await SchedulerLockRepository.acquire(name, LeaseLock.owner, lease_in_seconds):
+                LeaseLock.skipped[name] = LeaseLock.skipped.get(name, 0) + 1
+                holder_until = await SchedulerLockRepository.held_until(name)
+                print(f'Skipped {name}, another instance holds the lock until {holder_until}')
+                raise LeaseHeldError(name, holder_until)
+
+            LeaseLock.acquired[name] = LeaseLock.acquired.get(name, 0) + 1
+            renewal = asyncio.create_task(LeaseLock._keep_renewed(name, lease_in_seconds))
+
+            try:
+                return await job()
+            finally:
+                renewal.cancel()
+                await asyncio.gather(renewal, return_exceptions=True)
+                await SchedulerLockRepository.release(name, LeaseLock.owner, held_until)
+
+        return guarded_job
+
+    @staticmethod
+    async def _keep_renewed(name:str, lease_in_seconds:int):
+        # Renewed well before it expires, so that a long run keeps its lease
+        while True:
+            await asyncio.sleep(lease_in_seconds / 3)
+            try:
+                if not await SchedulerLockRepository.renew(name, LeaseLock.owner, lease_in_seconds):
+                    print(f'Lost the lock of {name} while it was running')
+                    return
+            except Exception as exc:
+                print(f'Failed to renew the lock of {name}: {exc}')
+
+    @staticmethod
+    def stats() -> dict:
+        return {
+            "acquired": dict(LeaseLock.acquired),
+            "skipped": dict(LeaseLock.skipped),
+        }
@@ -1,8 +1,23 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
 from passlib.context import CryptContext
+from utils.config import password_hashing_workers, password_hashing_queue_limit
 
 bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
+# bcrypt takes a few hundred milliseconds of CPU and releases the GIL, so it runs on its own threads
+password_executor = ThreadPoolExecutor(max_workers=int(password_hashing_workers), thread_name_prefix='password')
+
+R = TypeVar("R")
+
+class PasswordPoolSaturatedError(Exception):
+    pass
+
 class PasswordUtils:
+    # Hashes running or waiting for a thread, only touched from the event loop
+    in_flight = 0
+
     @staticmethod
     def hash_password(password:str) -> str:
         return bcrypt_context.hash(password)
@@ -11,3 +26,22 @@ class PasswordUtils:
     def verify_password(plane_password:str, hashed_password:str) -> bool:
         return bcrypt_context.verify(plane_password, hashed_password)
 
+    @staticmethod
+    async def hash_password_async(password:str) -> str:
+        return await PasswordUtils._run(PasswordUtils.hash_password, password)
+
+    @staticmethod
+    async def verify_password_async(plane_password:str, hashed_password:str) -> bool:
+        return await PasswordUtils._run(PasswordUtils.verify_password, plane_password, hashed_password)
+
+    @staticmethod
+    async def _run(func:Callable[..., R], *args) -> R:
+        """Raises PasswordPoolSaturatedError instead of queueing more than the configured limit."""
+        if PasswordUtils.in_flight >= int(password_hashing_workers) + int(password_hashing_queue_limit):
+            raise PasswordPoolSaturatedError()
+
+        PasswordUtils.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(password_executor, func, *args)
+        finally:
+            PasswordUtils.in_flight -= 1
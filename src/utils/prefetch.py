@@ -0,0 +1,64 @@
+import asyncio
+from typing import Union
+from mongoengine import Document
+from dto.response.category import CATEGORY_RESPONSE_FIELDS
+from dto.response.order import ORDER_RESPONSE_FIELDS
+from dto.response.user import USER_RESPONSE_FIELDS
+from models.order import Order
+from models.product import Product
+from models.refund import Refund
+from repositories.base import projection
+from repositories.category import CategoryRepository
+from repositories.order import OrderRepository
+from repositories.user import UserRepository
+
+
+# The response parsers dereference every reference of a document with its own query.
+# These functions load each referenced collection of a page once with an $in query, projected
+# on the fields of its response model, and return the documents as dicts with their references
+# replaced, ready for the parsers' dict path.
+class Prefetch:
+    @staticmethod
+    def to_dict(document:Union[Document, dict]) -> dict:
+        return document if isinstance(document, dict) else document.to_mongo().to_dict()
+
+    @staticmethod
+    async def products(products:list[Union[Product, dict]]) -> list[dict]:
+        products = [Prefetch.to_dict(product) for product in products]
+
+        users, categories = await asyncio.gather(
+            UserRepository.find_raw_by_ids({product["seller"] for product in products}, projection(USER_RESPONSE_FIELDS)),
+            CategoryRepository.find_raw_by_ids({product["category"] for product in products}, projection(CATEGORY_RESPONSE_FIELDS))
+        )
+
+        return [
+            {**product, "seller": users.get(product["seller"]), "category": categories.get(product["category"])}
+            for product in products
+        ]
+
+    @staticmethod
+    async def orders(orders:list[Union[Order, dict]]) -> list[dict]:
+        # The ordered products are rendered from their snapshot, only the clients are loaded
+        orders = [Prefetch.to_dict(order) for order in orders]
+
+        users = await UserRepository.find_raw_by_ids({order["client"] for order in orders}, projection(USER_RESPONSE_FIELDS))
+
+        return [{**order, "client": users.get(order["client"])} for order in orders]
+
+    @staticmethod
+    async def refunds(refunds:list[Union[Refund, dict]]) -> list[dict]:
+        refunds = [Prefetch.to_dict(refund) for refund in refunds]
+
+        orders = await OrderRepository.find_raw_by_ids({refund["order"] for refund in refunds}, projection(ORDER_RESPONSE_FIELDS))
+        orders = {order["_id"]: order for order in await Prefetch.orders(list(orders.values()))}
+
+        # The client of a refund is the client of its order, already loaded with it
+        return [
+            {
+                **refund,
+                "client": orders[refund["order"]]["client"] if refund["order"] in orders else None,
+                "order": orders.get(refund["order"])
+            }
+            for refund in refunds
+        ]
+
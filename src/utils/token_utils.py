@@ -1,10 +1,22 @@
+import hashlib
+import secrets
+import time
 from datetime import datetime, timedelta, timezone
 from jose import jwt
 from utils_types.user_info_in_token import UserInfoInToken
 from models.user import User
-from .config import access_token_secret_key, algorithm, access_token_duration_in_minutes
+from .config import access_token_secret_key, algorithm, access_token_duration_in_minutes, token_cache_max_size, token_cache_ttl_in_seconds
+from .ttl_cache import TTLCache
+
+verified_tokens: TTLCache[str, tuple[str, str, str]] = TTLCache(
+    max_size=int(token_cache_max_size),
+    ttl_in_seconds=int(token_cache_ttl_in_seconds)
+)
 
 class TokenUtils:
+    decode_count = 0
+    decode_seconds = 0.0
+
     @staticmethod
     def create_access_token(user: User) -> str:
         data = {
@@ -26,14 +38,44 @@ class TokenUtils:
      
     @staticmethod
     def decode_access_token(token:str) -> UserInfoInToken:
-        payload = jwt.decode(token, access_token_secret_key, algorithm)
+        # A token that was verified already is trusted until it expires
+        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        claims = verified_tokens.get(token_hash)
+
+        if claims is None:
+            started_at = time.perf_counter()
+            payload = jwt.decode(token, access_token_secret_key, algorithm)
+            TokenUtils.decode_count += 1
+            TokenUtils.decode_seconds += time.perf_counter() - started_at
 
-        decoded_user = payload.get("user", {})
+            decoded_user = payload.get("user", {})
+            claims = (decoded_user.get("id"), decoded_user.get("email"), decoded_user.get("role"))
+            verified_tokens.set(token_hash, claims, ttl_in_seconds=payload["exp"] - time.time())
 
+        id, email, role = claims
+
+        # A new object every time, the get_user dependency attaches the request's user to it
         user_info = UserInfoInToken(
-            id=decoded_user.get("id"),
-            email=decoded_user.get("email"),
-            role=decoded_user.get("role")
+            id=id,
+            email=email,
+            role=role
         )
 
-        return user_info
\ No newline at end of file
+        return user_info
+
+    @staticmethod
+    def create_refresh_token() -> str:
+        # Opaque, looked up by its hash, so renewing an access token costs a lookup and no password check
+        return secrets.token_urlsafe(48)
+
+    @staticmethod
+    def hash_refresh_token(refresh_token:str) -> str:
+        return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+    @staticmethod
+    def stats() -> dict:
+        return {
+            **verified_tokens.stats(),
+            "decode_count": TokenUtils.decode_count,
+            "average_decode_ms": TokenUtils.decode_seconds / TokenUtils.decode_count * 1000 if TokenUtils.decode_count else 0.0,
+        }
\ No newline at end of file
@@ -0,0 +1,33 @@
+from typing import Optional
+from models.user import User
+from repositories.user import UserRepository
+from utils.config import user_cache_max_size, user_cache_ttl_in_seconds
+from utils.ttl_cache import TTLCache
+
+_active_users: TTLCache[str, User] = TTLCache(
+    max_size=int(user_cache_max_size),
+    ttl_in_seconds=int(user_cache_ttl_in_seconds)
+)
+
+# Only active users are cached. Every write that changes a user's status, role or profile
+# invalidates its entry, the TTL bounds how long the other workers can see the old one.
+class UserCache:
+    @staticmethod
+    async def get_active_user(user_id:str) -> Optional[User]:
+        user = _active_users.get(user_id)
+        if user is not None:
+            return user
+
+        user = await UserRepository.find_one(id=user_id, deleted=False)
+        if user is not None:
+            _active_users.set(user_id, user)
+
+        return user
+
+    @staticmethod
+    def invalidate(user_id:str) -> None:
+        _active_users.invalidate(str(user_id))
+
+    @staticmethod
+    def stats() -> dict:
+        return _active_users.stats()
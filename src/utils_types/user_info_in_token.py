@@ -1,5 +1,10 @@
+from typing import Optional
+from models.user import User
+
 class UserInfoInToken:
-    def __init__(self, id: str, email: str, role: str):
+    def __init__(self, id: str, email: str, role: str, user: Optional[User] = None):
         self.id = id
         self.email = email
-        self.role = role
\ No newline at end of file
+        self.role = role
+        # The active user the token belongs to, resolved by the get_user dependency. None if deleted.
+        self.user = user
\ No newline at end of file
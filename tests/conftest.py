@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The application imports its modules from src, the way uvicorn runs it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+os.environ.setdefault('ROOT_PATH', '')
+os.environ.setdefault('CRON_JOB_MINUTES_INTERVAL', '5')
+os.environ.setdefault('MAX_PENDING_OR_FAILED_ORDER_TIME_IN_MINUTES', '60')
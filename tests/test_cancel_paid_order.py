@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+from bson import ObjectId
+from enums.order_status_enum import EnumOrderStatus
+from models.order import Order
+from models.ordered_product import OrderedProduct
+from models.user import User
+import services.order as order_service
+from repositories.financial_line import FinancialLineRepository
+from repositories.order import OrderRepository
+from repositories.refund import RefundRepository
+from services.order import OrderService
+from services.stock import StockService
+from services.stripe import StripeService
+
+class FakeOrders:
+    """The conditional status update of a single order."""
+    def __init__(self, status:str):
+        self.status = status
+
+    def update_one(self, filter, update, session=None):
+        if filter["status"] != self.status:
+            return SimpleNamespace(modified_count=0)
+        self.status = update["$set"]["status"]
+        return SimpleNamespace(modified_count=1)
+
+def test_concurrent_cancellations_refund_once(monkeypatch):
+    order = Order(
+        id=ObjectId(),
+        client=User(id=ObjectId(), fullname='client', email='client@assoh.com', password='x'),
+        products=[OrderedProduct(product=ObjectId(), price_at_order=10.0, quantity=1)],
+        total=10.0,
+        status=EnumOrderStatus.PAID.value,
+        payment_intent_id='pi_1'
+    )
+    orders = FakeOrders(EnumOrderStatus.PAID.value)
+    refunds_by_key: dict[str, str] = {}
+    recorded_refunds = []
+
+    async def refund_client(payment_intent_id, amount_in_cents, idempotency_key=None):
+        # Stripe gives back the refund already made for an idempotency key
+        assert idempotency_key is not None
+        await asyncio.sleep(0)
+        return refunds_by_key.setdefault(idempotency_key, f're_{len(refunds_by_key) + 1}')
+
+    async def run_in_transaction(callback):
+        return callback(None)
+
+    async def parsed_orders(orders):
+        return orders
+
+    monkeypatch.setattr(order_service, 'refund_percentage', '50')
+    monkeypatch.setattr(order_service, 'run_in_transaction', run_in_transaction)
+    monkeypatch.setattr(order_service.Prefetch, 'orders', parsed_orders)
+    monkeypatch.setattr(order_service.OrderResponseParser, 'parse', lambda order: order)
+    monkeypatch.setattr(StripeService, 'refund_client', refund_client)
+    monkeypatch.setattr(OrderRepository, 'collection', lambda: orders)
+    monkeypatch.setattr(FinancialLineRepository, 'collection', lambda: SimpleNamespace(update_many=lambda *args, **kwargs: None))
+    monkeypatch.setattr(RefundRepository, 'insert_with_session', lambda refund, session: recorded_refunds.append(refund))
+    monkeypatch.setattr(StockService, 'release_with_session', lambda quantities, session: None)
+
+    async def cancel_twice():
+        return await asyncio.gather(*[
+            OrderService.remove_order_completely_and_set_status(
+                order=order,
+                status=EnumOrderStatus.CANCELLED_AFTER_PAYMENT,
+                unset_financial_lines=True,
+                initial_refund=True
+            )
+            for _ in range(2)
+        ])
+
+    results = asyncio.run(cancel_twice())
+
+    assert sorted(result["status_code"] for result in results) == ['CANCELLED_SUCCESSFULLY', 'ORDER_STATUS_CHANGED']
+    assert len(refunds_by_key) == 1
+    assert [refund.refund_id for refund in recorded_refunds] == ['re_1']
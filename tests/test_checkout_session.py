@@ -0,0 +1,38 @@
+import asyncio
+from bson import ObjectId
+import stripe
+from models.order import Order
+from models.ordered_product import OrderedProduct
+from services.stripe import StripeService
+
+def test_line_items_are_named_and_described_from_the_snapshot_without_loading_products(monkeypatch):
+    sessions = []
+
+    async def create_async(**params):
+        sessions.append(params)
+        return params
+
+    monkeypatch.setattr(stripe.checkout.Session, 'create_async', create_async)
+
+    # No database is connected, loading a product would fail
+    snapshotted, legacy = ObjectId(), ObjectId()
+    order = Order(
+        id=ObjectId(),
+        client=ObjectId(),
+        total=35.0,
+        products=[
+            OrderedProduct(product=snapshotted, price_at_order=12.5, quantity=2, name='Sneakers', description='Running shoes'),
+            OrderedProduct(product=legacy, price_at_order=10.0, quantity=1)
+        ]
+    )
+
+    asyncio.run(StripeService.create_checkout_session(order=order))
+
+    line_items = sessions[0]['line_items']
+    assert [item['price_data']['product_data'] for item in line_items] == [
+        {'name': 'Sneakers', 'description': 'Running shoes'},
+        {'name': f'Product {legacy}'}
+    ]
+    assert [item['price_data']['unit_amount'] for item in line_items] == [1250, 1000]
+    assert [item['quantity'] for item in line_items] == [2, 1]
+    assert sessions[0]['metadata'] == {'order_id': str(order.id)}
@@ -0,0 +1,55 @@
+import asyncio
+from pymongo.errors import OperationFailure
+import pytest
+from tasks import cleanup_pending_orders as cleanup
+
+def transient_error() -> OperationFailure:
+    return OperationFailure('WriteConflict', code=112, details={'errorLabels': ['TransientTransactionError']})
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Each transaction takes the next outcome: an exception to raise or the (orders, products) it cancelled."""
+    outcomes: list = []
+    calls: list[int] = []
+
+    async def run_in_transaction(callback):
+        calls.append(1)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(cleanup, 'run_in_transaction', run_in_transaction)
+    monkeypatch.setattr(cleanup, 'cleanup_batch_size', '2')
+    return outcomes, calls
+
+def test_transient_transaction_errors_retry_the_batch(batches):
+    outcomes, calls = batches
+    outcomes.extend([(2, 3), transient_error(), transient_error(), (1, 1)])
+
+    report = asyncio.run(cleanup.cleanup_pending_orders())
+
+    assert len(calls) == 4
+    assert report['failed'] is False
+    assert report['cancelled_orders'] == 3
+    assert report['restored_products'] == 4
+    assert report['batches'] == 2
+
+def test_a_batch_failing_every_attempt_stops_the_run(batches):
+    outcomes, calls = batches
+    outcomes.extend([transient_error()] * cleanup.TRANSACTION_ATTEMPTS)
+
+    report = asyncio.run(cleanup.cleanup_pending_orders())
+
+    assert len(calls) == cleanup.TRANSACTION_ATTEMPTS
+    assert report['failed'] is True
+    assert report['cancelled_orders'] == 0
+
+def test_other_errors_are_not_retried(batches):
+    outcomes, calls = batches
+    outcomes.append(OperationFailure('Unauthorized', code=13))
+
+    report = asyncio.run(cleanup.cleanup_pending_orders())
+
+    assert len(calls) == 1
+    assert report['failed'] is True
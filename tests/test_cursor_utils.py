@@ -0,0 +1,48 @@
+from datetime import datetime
+from types import SimpleNamespace
+from bson import ObjectId
+import pytest
+from utils.cursor_utils import CursorUtils
+
+def test_a_cursor_decodes_to_the_key_it_encodes():
+    created_at, id = datetime(2026, 5, 1, 12, 30, 15, 123000), ObjectId()
+
+    assert CursorUtils.decode(CursorUtils.encode(created_at, id)) == (created_at, id)
+
+@pytest.mark.parametrize('cursor', ['', 'not a cursor', 'eyJmb28iOiAxfQ==', CursorUtils.encode(datetime(2026, 1, 1), ObjectId())[:-6]])
+def test_an_invalid_cursor_raises_a_value_error(cursor):
+    with pytest.raises(ValueError):
+        CursorUtils.decode(cursor)
+
+def test_after_match_resumes_after_the_key():
+    created_at, id = datetime(2026, 5, 1), ObjectId()
+
+    assert CursorUtils.after_match(CursorUtils.encode(created_at, id)) == {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": id}}
+        ]
+    }
+
+def test_after_query_resumes_after_the_key():
+    created_at, id = datetime(2026, 5, 1), ObjectId()
+
+    query = CursorUtils.after_query(CursorUtils.encode(created_at, id)).to_query(None)
+
+    assert query == {"$or": [{"created_at": {"$lt": created_at}}, {"created_at": created_at, "id": {"$lt": id}}]}
+
+def test_a_last_page_has_no_cursor():
+    items = [{"_id": ObjectId(), "created_at": datetime(2026, 5, 1)} for _ in range(3)]
+
+    assert CursorUtils.next_page(items, 3) == (items, None)
+
+def test_the_next_cursor_points_after_the_last_item_of_the_page():
+    raw = [{"_id": ObjectId(), "created_at": datetime(2026, 5, day)} for day in (4, 3, 2)]
+    formatted = [{"id": str(item["_id"]), "created_at": item["created_at"]} for item in raw]
+    documents = [SimpleNamespace(pk=item["_id"], created_at=item["created_at"]) for item in raw]
+
+    for items in (raw, formatted, documents):
+        page, cursor = CursorUtils.next_page(items, 2)
+
+        assert page == items[:2]
+        assert CursorUtils.decode(cursor) == (raw[1]["created_at"], raw[1]["_id"])
@@ -0,0 +1,23 @@
+import pytest
+from tasks.ensure_indexes import MODELS, IndexCreationError, ensure_indexes_sync
+
+def test_a_failing_collection_does_not_skip_the_others_and_fails(monkeypatch):
+    ensured = []
+    failing = MODELS[2]
+
+    def ensure(model):
+        def ensure_model_indexes():
+            if model is failing:
+                raise RuntimeError('IndexOptionsConflict')
+            ensured.append(model)
+        return ensure_model_indexes
+
+    for model in MODELS:
+        monkeypatch.setattr(model, 'ensure_indexes', ensure(model))
+        monkeypatch.setattr(model, '_get_collection_name', classmethod(lambda cls: cls.__name__.lower()))
+
+    with pytest.raises(IndexCreationError) as error:
+        ensure_indexes_sync()
+
+    assert ensured == [model for model in MODELS if model is not failing]
+    assert list(error.value.failures) == [failing.__name__.lower()]
@@ -0,0 +1,22 @@
+import json
+from fastapi import Response
+from enums.response_codes import EnumResponseStatusCode
+from dto.response.paginated import Paginated
+from dto.response.category import CategoryResponseModel
+from utils.fast_json_response import FastJSONResponse
+from utils.orchestration_result import OrchestrationResult
+
+def test_a_result_of_response_models_is_encoded_like_pydantic_would():
+    page = Paginated[CategoryResponseModel](
+        items=[CategoryResponseModel(id='1', name='shoes', description='Shoes', created_at='2026-05-01 00:00:00', updated_at=None, deleted_at=None)],
+        limit=10,
+        page=1,
+        total_items=1,
+        total_pages=1
+    )
+    result = OrchestrationResult.success(data=page, message='Recovered successfully', status_code=EnumResponseStatusCode.RECOVERED_SUCCESSFULLY)
+
+    response = FastJSONResponse.from_result(result, Response(), default_status_code=200)
+
+    assert response.status_code == 200
+    assert json.loads(response.body) == {**result, "data": page.model_dump(mode='json')}
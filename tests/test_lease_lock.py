@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from repositories.scheduler_lock import SchedulerLockRepository
+from utils import lease_lock
+from utils.lease_lock import LeaseHeldError, LeaseLock
+
+@pytest.fixture
+def locks(monkeypatch):
+    """The scheduler_lock collection, as {name: {"owner", "expires_at"}}."""
+    stored: dict[str, dict] = {}
+
+    async def acquire(name, owner, lease_in_seconds):
+        now = datetime.utcnow()
+        lock = stored.get(name)
+        if lock is not None and lock["expires_at"] >= now and lock["owner"] != owner:
+            return False
+        stored[name] = {"owner": owner, "expires_at": now + timedelta(seconds=lease_in_seconds)}
+        return True
+
+    async def held_until(name):
+        return stored[name]["expires_at"] if name in stored else None
+
+    async def renew(name, owner, lease_in_seconds):
+        if stored.get(name, {}).get("owner") != owner:
+            return False
+        stored[name]["expires_at"] = datetime.utcnow() + timedelta(seconds=lease_in_seconds)
+        return True
+
+    async def release(name, owner, held_until):
+        if stored.get(name, {}).get("owner") == owner:
+            stored[name]["expires_at"] = held_until
+
+    monkeypatch.setattr(SchedulerLockRepository, 'acquire', acquire)
+    monkeypatch.setattr(SchedulerLockRepository, 'held_until', held_until)
+    monkeypatch.setattr(SchedulerLockRepository, 'renew', renew)
+    monkeypatch.setattr(SchedulerLockRepository, 'release', release)
+    monkeypatch.setattr(lease_lock, 'scheduler_lock_lease_in_seconds', '60')
+    monkeypatch.setattr(LeaseLock, 'acquired', {})
+    monkeypatch.setattr(LeaseLock, 'skipped', {})
+    return stored
+
+def test_a_held_lease_skips_the_run_with_the_end_of_the_holder_lease(locks, monkeypatch):
+    runs = []
+
+    async def job():
+        runs.append(LeaseLock.owner)
+        # Another instance fires on the same tick while this one runs
+        monkeypatch.setattr(LeaseLock, 'owner', 'instance-b')
+        with pytest.raises(LeaseHeldError) as skipped:
+            await guarded()
+        return skipped.value
+
+    guarded = LeaseLock.guard('job', job)
+    monkeypatch.setattr(LeaseLock, 'owner', 'instance-a')
+
+    skipped = asyncio.run(guarded())
+
+    assert runs == ['instance-a']
+    assert skipped.name == 'job'
+    assert skipped.held_until == locks['job']['expires_at']
+    assert LeaseLock.stats() == {"acquired": {"job": 1}, "skipped": {"job": 1}}
+
+def test_the_lease_is_held_for_at_least_one_lease_after_a_quick_run(locks, monkeypatch):
+    async def job():
+        return 'done'
+
+    guarded = LeaseLock.guard('job', job)
+    monkeypatch.setattr(LeaseLock, 'owner', 'instance-a')
+    started_at = datetime.utcnow()
+
+    assert asyncio.run(guarded()) == 'done'
+    assert locks['job']['expires_at'] >= started_at + timedelta(seconds=60)
+
+    # An instance firing on the same tick a little later still finds it held
+    monkeypatch.setattr(LeaseLock, 'owner', 'instance-b')
+    with pytest.raises(LeaseHeldError):
+        asyncio.run(guarded())
+
+def test_a_failing_job_releases_its_lease(locks, monkeypatch):
+    async def job():
+        raise RuntimeError('job failed')
+
+    guarded = LeaseLock.guard('job', job)
+    monkeypatch.setattr(lease_lock, 'scheduler_lock_lease_in_seconds', '0')
+    monkeypatch.setattr(LeaseLock, 'owner', 'instance-a')
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(guarded())
+
+    # The lease ended, another instance takes the lock
+    monkeypatch.setattr(LeaseLock, 'owner', 'instance-b')
+    monkeypatch.setattr(lease_lock, 'scheduler_lock_lease_in_seconds', '60')
+    with pytest.raises(RuntimeError):
+        asyncio.run(guarded())
+    assert locks['job']['owner'] == 'instance-b'
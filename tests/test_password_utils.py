@@ -0,0 +1,53 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from utils import password_utils
+from utils.password_utils import PasswordPoolSaturatedError, PasswordUtils
+
+@pytest.fixture
+def pool(monkeypatch):
+    """One worker and one queued hash at most."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(password_utils, 'password_executor', executor)
+    monkeypatch.setattr(password_utils, 'password_hashing_workers', '1')
+    monkeypatch.setattr(password_utils, 'password_hashing_queue_limit', '1')
+    monkeypatch.setattr(PasswordUtils, 'in_flight', 0)
+    yield
+    executor.shutdown(wait=True)
+
+def test_hashes_past_the_queue_limit_are_rejected_until_the_pool_drains(pool):
+    release = threading.Event()
+
+    def slow_hash(password):
+        release.wait(timeout=5)
+        return f'hashed {password}'
+
+    async def scenario():
+        running = [asyncio.create_task(PasswordUtils._run(slow_hash, str(index))) for index in range(2)]
+        await asyncio.sleep(0)
+        assert PasswordUtils.in_flight == 2
+
+        with pytest.raises(PasswordPoolSaturatedError):
+            await PasswordUtils._run(slow_hash, 'rejected')
+
+        release.set()
+        assert await asyncio.gather(*running) == ['hashed 0', 'hashed 1']
+        assert PasswordUtils.in_flight == 0
+
+        assert await PasswordUtils._run(slow_hash, 'accepted') == 'hashed accepted'
+
+    asyncio.run(scenario())
+
+def test_a_failing_hash_frees_its_slot(pool):
+    def failing_hash(password):
+        raise RuntimeError('bcrypt failed')
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await PasswordUtils._run(failing_hash, 'password')
+
+        assert PasswordUtils.in_flight == 0
+
+    asyncio.run(scenario())
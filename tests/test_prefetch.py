@@ -0,0 +1,171 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from bson import ObjectId
+import pytest
+from dto.response.product import ProductResponseParser
+from dto.response.refund import RefundResponseParser
+from dto.response.order import OrderResponseParser
+from enums.order_status_enum import EnumOrderStatus
+from enums.refund_status import EnumRefundStatus
+from enums.response_codes import EnumResponseStatusCode
+from models.product import Product
+from models.user import User
+from repositories.base import BaseRepository
+from services.admin import AdminService
+from services.order import OrderService
+from utils.prefetch import Prefetch
+from utils_types.user_info_in_token import UserInfoInToken
+
+PAGE_SIZE = 20
+
+class FakeDatabase:
+    """Raw documents by repository, and every query the repositories ran, as (repository, method)."""
+    def __init__(self):
+        self.documents: dict[str, dict[ObjectId, dict]] = defaultdict(dict)
+        self.queries: list[tuple[str, str]] = []
+
+    def add(self, repository:str, **fields) -> dict:
+        document = {"_id": ObjectId(), "created_at": datetime.utcnow(), **fields}
+        self.documents[repository][document["_id"]] = document
+        return document
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+
+    async def find_raw_by_ids(cls, ids, projection=None):
+        database.queries.append((cls.__name__, 'find_raw_by_ids'))
+        documents = database.documents[cls.__name__]
+        return {id: documents[id] for id in ids if id in documents}
+
+    async def find_raw(cls, *args, fields, skip=None, limit=None, order_by=None, **filters):
+        database.queries.append((cls.__name__, 'find_raw'))
+        return list(database.documents[cls.__name__].values())[:limit]
+
+    async def count(cls, *args, **filters):
+        database.queries.append((cls.__name__, 'count'))
+        return len(database.documents[cls.__name__])
+
+    async def aggregate(cls, pipeline):
+        # Only the joined order listing aggregates here, the $lookup of its client is emulated
+        database.queries.append((cls.__name__, 'aggregate'))
+        users = database.documents['UserRepository']
+        limit = next(stage["$limit"] for stage in pipeline if "$limit" in stage)
+        return [
+            {**order, "client": users[order["client"]]}
+            for order in list(database.documents[cls.__name__].values())[:limit]
+        ]
+
+    monkeypatch.setattr(BaseRepository, 'find_raw_by_ids', classmethod(find_raw_by_ids))
+    monkeypatch.setattr(BaseRepository, 'find_raw', classmethod(find_raw))
+    monkeypatch.setattr(BaseRepository, 'count', classmethod(count))
+    monkeypatch.setattr(BaseRepository, 'aggregate', classmethod(aggregate))
+    return database
+
+def add_user(database:FakeDatabase, name:str) -> dict:
+    return database.add('UserRepository', fullname=name, email=f'{name}@assoh.com', role='CLIENT')
+
+def add_order(database:FakeDatabase, client:dict) -> dict:
+    return database.add(
+        'OrderRepository',
+        client=client["_id"],
+        total=20.0,
+        status=EnumOrderStatus.CANCELLED_AFTER_PAYMENT.value,
+        products=[{"product": ObjectId(), "price_at_order": 10.0, "quantity": 2, "name": 'Sneakers'}]
+    )
+
+def add_refunds(database:FakeDatabase, clients:list[dict]) -> None:
+    """One refund per order, for PAGE_SIZE + 1 orders of these clients."""
+    for index in range(PAGE_SIZE + 1):
+        client = clients[index % len(clients)]
+        order = add_order(database, client)
+        database.add(
+            'RefundRepository',
+            client=client["_id"],
+            order=order["_id"],
+            status=EnumRefundStatus.SUCCESS.value,
+            original_amount=20.0,
+            refunded_amount=10.0,
+            refund_id=f're_{index}'
+        )
+
+def test_products_are_parsed_with_one_query_per_referenced_collection(database):
+    seller = database.add('UserRepository', fullname='seller', email='seller@assoh.com', role='SELLER')
+    category = database.add('CategoryRepository', name='shoes', description='shoes')
+
+    products = [
+        Product(id=ObjectId(), name=f'product {index}', description='d', price=1.0, quantity=1, seller=seller['_id'], category=category['_id'], created_at=datetime.utcnow())
+        for index in range(PAGE_SIZE)
+    ]
+
+    parsed = [ProductResponseParser.parse(product) for product in asyncio.run(Prefetch.products(products))]
+
+    assert sorted(database.queries) == [('CategoryRepository', 'find_raw_by_ids'), ('UserRepository', 'find_raw_by_ids')]
+    assert {product.seller.fullname for product in parsed} == {'seller'}
+    assert {product.category.name for product in parsed} == {'shoes'}
+
+def test_orders_are_parsed_with_one_query_for_their_clients(database):
+    clients = [add_user(database, f'client{index}') for index in range(3)]
+    orders = [add_order(database, clients[index % 3]) for index in range(PAGE_SIZE)]
+
+    parsed = [OrderResponseParser.parse(order) for order in asyncio.run(Prefetch.orders(orders))]
+
+    assert database.queries == [('UserRepository', 'find_raw_by_ids')]
+    assert [order.client.fullname for order in parsed] == [f'client{index % 3}' for index in range(PAGE_SIZE)]
+    assert {order.products[0].name for order in parsed} == {'Sneakers'}
+
+def test_refunds_are_parsed_with_one_query_for_their_orders_and_one_for_the_clients(database):
+    clients = [add_user(database, f'client{index}') for index in range(3)]
+    add_refunds(database, clients)
+    refunds = list(database.documents['RefundRepository'].values())
+
+    parsed = [RefundResponseParser.parse(refund) for refund in asyncio.run(Prefetch.refunds(refunds))]
+
+    # The client of a refund comes with its order, it is not loaded twice
+    assert database.queries == [('OrderRepository', 'find_raw_by_ids'), ('UserRepository', 'find_raw_by_ids')]
+    assert [refund.client.fullname for refund in parsed] == [f'client{index % 3}' for index in range(PAGE_SIZE + 1)]
+    assert all(refund.order.client == refund.client for refund in parsed)
+
+def test_my_refunds_take_four_queries_for_a_page(database):
+    client = add_user(database, 'client')
+    add_refunds(database, [client])
+    user_info = UserInfoInToken(id=str(client["_id"]), email=client["email"], role='CLIENT', user=User(id=client["_id"]))
+
+    result = asyncio.run(OrderService.get_my_refunds(page=1, limit=PAGE_SIZE, user_info=user_info))
+
+    assert result["status_code"] == EnumResponseStatusCode.RECOVERED_SUCCESSFULLY.value
+    assert len(result["data"].items) == PAGE_SIZE
+    assert database.queries == [
+        ('RefundRepository', 'count'),
+        ('RefundRepository', 'find_raw'),
+        ('OrderRepository', 'find_raw_by_ids'),
+        ('UserRepository', 'find_raw_by_ids')
+    ]
+
+def test_admin_refunds_take_four_queries_for_a_page(database):
+    add_refunds(database, [add_user(database, f'client{index}') for index in range(5)])
+
+    result = asyncio.run(AdminService.get_refunds(page=1, limit=PAGE_SIZE, status=EnumRefundStatus.SUCCESS))
+
+    assert result["status_code"] == EnumResponseStatusCode.RECOVERED_SUCCESSFULLY.value
+    assert len(result["data"].items) == PAGE_SIZE
+    assert database.queries == [
+        ('RefundRepository', 'count'),
+        ('RefundRepository', 'find_raw'),
+        ('OrderRepository', 'find_raw_by_ids'),
+        ('UserRepository', 'find_raw_by_ids')
+    ]
+
+def test_my_orders_are_joined_in_one_aggregation(database):
+    client = add_user(database, 'client')
+    for _ in range(PAGE_SIZE + 1):
+        add_order(database, client)
+    user_info = UserInfoInToken(id=str(client["_id"]), email=client["email"], role='CLIENT', user=User(id=client["_id"]))
+
+    result = asyncio.run(OrderService.get_my_orders(page=1, limit=PAGE_SIZE, user_info=user_info, order_status=None))
+
+    assert result["status_code"] == EnumResponseStatusCode.RECOVERED_SUCCESSFULLY.value
+    assert len(result["data"].items) == PAGE_SIZE
+    assert {order.client.fullname for order in result["data"].items} == {'client'}
+    assert database.queries == [('OrderRepository', 'count'), ('OrderRepository', 'aggregate')]
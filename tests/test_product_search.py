@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from repositories.product import ProductRepository
+from services.product import ProductService
+
+@pytest.fixture
+def queries(monkeypatch):
+    """The pipelines and the counts run by the search, the page is empty and total products are counted."""
+    ran = {'pipelines': [], 'counts': [], 'total': 25_000}
+
+    async def aggregate(pipeline):
+        ran['pipelines'].append(pipeline)
+        return []
+
+    async def count_raw(query, limit=None):
+        ran['counts'].append((query, limit))
+        return min(ran['total'], limit) if limit else ran['total']
+
+    monkeypatch.setattr(ProductRepository, 'aggregate', aggregate)
+    monkeypatch.setattr(ProductRepository, 'count_raw', count_raw)
+    return ran
+
+def search(**options):
+    return asyncio.run(ProductService.search_product(
+        page=1, limit=10, product_name='', seller_id='', category_id='', min_price=0, max_price=0, **options
+    ))
+
+def test_the_estimated_total_caps_the_count_itself(queries, monkeypatch):
+    monkeypatch.setattr('services.product.product_search_count_limit', '10000')
+
+    result = search(estimate_total=True)
+
+    assert queries['counts'] == [({'deleted': False}, 10000)]
+    assert result['data'].total_items == 10000
+    assert result['data'].total_is_estimated is True
+    # The page is read on its own, no stage counts the whole match
+    assert not any('$facet' in stage for stage in queries['pipelines'][0])
+
+def test_the_exact_total_is_not_capped(queries):
+    result = search()
+
+    assert queries['counts'] == [({'deleted': False}, None)]
+    assert result['data'].total_items == 25_000
+    assert result['data'].total_pages == 2500
+    assert result['data'].total_is_estimated is False
+
+def test_no_count_runs_without_the_total(queries):
+    result = search(include_total=False)
+
+    assert queries['counts'] == []
+    assert result['data'].total_items is None
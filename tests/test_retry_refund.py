@@ -0,0 +1,56 @@
+import asyncio
+from bson import ObjectId
+from enums.refund_status import EnumRefundStatus
+from enums.response_codes import EnumResponseStatusCode
+from models.refund import Refund
+from repositories.order import OrderRepository
+from repositories.refund import RefundRepository
+from services.admin import AdminService
+from services.stripe import StripeService
+import services.admin as admin_service
+
+def test_a_failed_refund_is_retried_for_its_own_amount_without_dereferencing_the_order(monkeypatch):
+    # No database is connected, dereferencing the order or the client would fail
+    order_id = ObjectId()
+    refund = Refund(
+        id=ObjectId(),
+        client=ObjectId(),
+        order=order_id,
+        status=EnumRefundStatus.FAILED.value,
+        original_amount=40.0,
+        refunded_amount=20.0,
+        refund_id='re_failed'
+    )
+    stripe_refunds = []
+    saved = []
+
+    async def find_one(**filters):
+        return refund
+
+    async def find_raw_by_ids(ids, projection=None):
+        assert list(ids) == [order_id]
+        return {order_id: {"_id": order_id, "payment_intent_id": 'pi_1'}}
+
+    async def refund_client(payment_intent_id, amount_in_cents, idempotency_key=None):
+        stripe_refunds.append((payment_intent_id, amount_in_cents))
+        return 're_retried'
+
+    async def save(document):
+        saved.append((document.status, document.refund_id))
+        return document
+
+    async def prefetched_refunds(refunds):
+        return refunds
+
+    monkeypatch.setattr(RefundRepository, 'find_one', find_one)
+    monkeypatch.setattr(RefundRepository, 'save', save)
+    monkeypatch.setattr(OrderRepository, 'find_raw_by_ids', find_raw_by_ids)
+    monkeypatch.setattr(StripeService, 'refund_client', refund_client)
+    monkeypatch.setattr(admin_service.Prefetch, 'refunds', prefetched_refunds)
+    monkeypatch.setattr(admin_service.RefundResponseParser, 'parse', lambda refund: refund)
+
+    result = asyncio.run(AdminService.retry_refund(str(refund.pk)))
+
+    assert result["status_code"] == EnumResponseStatusCode.REFUND_INITIATED.value
+    assert stripe_refunds == [('pi_1', 2000)]
+    assert saved == [(EnumRefundStatus.CREATED.value, 're_retried')]
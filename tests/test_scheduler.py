@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime, timedelta
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+import pytest
+import scheduler
+from repositories.order import OrderRepository
+from repositories.scheduler_lock import SchedulerLockRepository
+
+@pytest.fixture(autouse=True)
+def fresh_scheduler(monkeypatch):
+    monkeypatch.setattr(scheduler, 'scheduler', AsyncIOScheduler())
+    monkeypatch.setattr(scheduler, 'consecutive_failures', 0)
+
+def next_expiry_in(monkeypatch, delta:timedelta):
+    async def next_expiry(statuses):
+        return datetime.utcnow() + delta
+    monkeypatch.setattr(OrderRepository, 'next_expiry', next_expiry)
+
+def seconds_until_next_run() -> float:
+    job = scheduler.scheduler.get_job(scheduler.ORDER_EXPIRY_JOB_ID)
+    assert job is not None
+    return (job.next_run_time.replace(tzinfo=None) - datetime.utcnow()).total_seconds()
+
+def run(coroutine_function):
+    async def main():
+        scheduler.scheduler.start(paused=True)
+        try:
+            await coroutine_function()
+        finally:
+            scheduler.scheduler.shutdown(wait=False)
+    asyncio.run(main())
+
+def test_reschedules_at_the_next_expiry(monkeypatch):
+    async def cleanup():
+        return {"failed": False}
+    monkeypatch.setattr(scheduler, 'guarded_cleanup_pending_orders', cleanup)
+    next_expiry_in(monkeypatch, timedelta(seconds=60))
+
+    async def check():
+        await scheduler.expire_orders()
+        assert 55 < seconds_until_next_run() <= 60
+    run(check)
+
+def test_an_already_due_expiry_is_scheduled_after_the_minimum_delay(monkeypatch):
+    async def cleanup():
+        return {"failed": False}
+    monkeypatch.setattr(scheduler, 'guarded_cleanup_pending_orders', cleanup)
+    next_expiry_in(monkeypatch, timedelta(minutes=-1))
+
+    async def check():
+        await scheduler.expire_orders()
+        assert seconds_until_next_run() > scheduler.MIN_DELAY_IN_SECONDS - 1
+    run(check)
+
+def test_a_skipped_run_waits_for_the_end_of_the_lease(monkeypatch):
+    async def acquire(name, owner, lease_in_seconds):
+        return False
+    async def held_until(name):
+        return datetime.utcnow() + timedelta(seconds=40)
+    monkeypatch.setattr(SchedulerLockRepository, 'acquire', acquire)
+    monkeypatch.setattr(SchedulerLockRepository, 'held_until', held_until)
+    next_expiry_in(monkeypatch, timedelta(minutes=-1))
+
+    async def check():
+        await scheduler.expire_orders()
+        assert 35 < seconds_until_next_run() <= 40
+    run(check)
+
+def test_a_failed_run_backs_off_and_keeps_the_job(monkeypatch):
+    async def cleanup():
+        return {"failed": True}
+    monkeypatch.setattr(scheduler, 'guarded_cleanup_pending_orders', cleanup)
+    next_expiry_in(monkeypatch, timedelta(minutes=-1))
+
+    async def check():
+        await scheduler.expire_orders()
+        first_backoff = seconds_until_next_run()
+        await scheduler.expire_orders()
+        second_backoff = seconds_until_next_run()
+
+        assert first_backoff > scheduler.FAILURE_BACKOFF_IN_SECONDS - 1
+        assert second_backoff > first_backoff
+    run(check)
+
+def test_a_crashed_run_keeps_the_job(monkeypatch):
+    async def cleanup():
+        raise RuntimeError('database is down')
+    async def next_expiry(statuses):
+        raise RuntimeError('database is down')
+    monkeypatch.setattr(scheduler, 'guarded_cleanup_pending_orders', cleanup)
+    monkeypatch.setattr(OrderRepository, 'next_expiry', next_expiry)
+
+    async def check():
+        await scheduler.expire_orders()
+        assert seconds_until_next_run() > 0
+    run(check)
+
+def test_the_watchdog_schedules_a_missing_job():
+    async def check():
+        assert scheduler.scheduler.get_job(scheduler.ORDER_EXPIRY_JOB_ID) is None
+        await scheduler.ensure_order_expiry_job()
+        assert seconds_until_next_run() > 0
+    run(check)
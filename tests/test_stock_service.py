@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from bson import ObjectId
+from pymongo import UpdateOne
+import pytest
+from repositories.product import ProductRepository
+from services.stock import InsufficientStockError, StockService
+
+class FakeProducts:
+    """The product collection, applying the filter and the $inc of each update atomically, the way mongod writes one document.
+
+    The updates come from the threadpool threads of run_blocking, the lock makes each of them atomic.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.documents: dict[ObjectId, dict] = {}
+        self.updates: list[tuple[dict, dict]] = []
+
+    def add(self, quantity:int, deleted:bool = False) -> ObjectId:
+        product_id = ObjectId()
+        self.documents[product_id] = {"_id": product_id, "quantity": quantity, "deleted": deleted}
+        return product_id
+
+    def quantities(self) -> dict[ObjectId, int]:
+        return {product_id: document["quantity"] for product_id, document in self.documents.items()}
+
+    def update_one(self, filter:dict, update:dict, session=None):
+        with self.lock:
+            self.updates.append((filter, update))
+            document = self.documents.get(filter["_id"])
+            if document is None or not all(self.matches(document.get(field), condition) for field, condition in filter.items()):
+                return SimpleNamespace(modified_count=0)
+
+            assert set(update) == {"$inc"}
+            for field, amount in update["$inc"].items():
+                document[field] += amount
+            return SimpleNamespace(modified_count=1)
+
+    def bulk_write(self, operations:list[UpdateOne], ordered:bool = True, session=None):
+        for operation in operations:
+            self.update_one(operation._filter, operation._doc)
+
+    @staticmethod
+    def matches(value, condition) -> bool:
+        if not isinstance(condition, dict):
+            return value == condition
+        assert set(condition) == {"$gte"}
+        return value >= condition["$gte"]
+
+@pytest.fixture
+def products(monkeypatch):
+    products = FakeProducts()
+    monkeypatch.setattr(ProductRepository, 'collection', lambda: products)
+    return products
+
+def test_take_stock_only_decrements_a_product_with_enough_stock(products):
+    product = products.add(5)
+
+    assert ProductRepository.take_stock(product, 3) is True
+    assert ProductRepository.take_stock(product, 3) is False
+
+    assert products.updates[0] == (
+        {"_id": product, "deleted": False, "quantity": {"$gte": 3}},
+        {"$inc": {"quantity": -3}}
+    )
+    assert products.quantities() == {product: 2}
+
+def test_take_stock_skips_a_deleted_product(products):
+    product = products.add(5, deleted=True)
+
+    assert ProductRepository.take_stock(product, 1) is False
+    assert products.quantities() == {product: 5}
+
+def test_reserve_takes_every_product(products):
+    first, second = products.add(5), products.add(2)
+
+    asyncio.run(StockService.reserve({first: 3, second: 2}))
+
+    assert products.quantities() == {first: 2, second: 0}
+
+def test_reserve_gives_back_what_it_took_when_a_product_is_short(products):
+    first, second, third = products.add(5), products.add(1), products.add(4)
+
+    with pytest.raises(InsufficientStockError):
+        asyncio.run(StockService.reserve({first: 3, second: 2, third: 4}))
+
+    assert products.quantities() == {first: 5, second: 1, third: 4}
+
+def test_concurrent_reservations_never_oversell(products):
+    product = products.add(10)
+
+    async def reserve_many():
+        async def reserve():
+            try:
+                await StockService.reserve({product: 1})
+                return True
+            except InsufficientStockError:
+                return False
+        return await asyncio.gather(*[reserve() for _ in range(50)])
+
+    results = asyncio.run(reserve_many())
+
+    assert results.count(True) == 10
+    assert products.quantities() == {product: 0}
@@ -0,0 +1,66 @@
+import pytest
+from utils import ttl_cache
+from utils.ttl_cache import TTLCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock that only moves when the test advances it."""
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = TTLCache(max_size=10, ttl_in_seconds=60)
+    cache.set('user', 1)
+
+    clock[0] += 59
+    assert cache.get('user') == 1
+
+    clock[0] += 1
+    assert cache.get('user') is None
+    assert cache.stats()['size'] == 0
+
+def test_an_entry_expiry_is_capped_by_the_cache_ttl(clock):
+    cache = TTLCache(max_size=10, ttl_in_seconds=60)
+    cache.set('short', 1, ttl_in_seconds=10)
+    cache.set('long', 2, ttl_in_seconds=3600)
+
+    clock[0] += 10
+    assert cache.get('short') is None
+    assert cache.get('long') == 2
+
+    clock[0] += 50
+    assert cache.get('long') is None
+
+def test_an_already_expired_entry_is_not_stored(clock):
+    cache = TTLCache(max_size=10, ttl_in_seconds=60)
+    cache.set('user', 1, ttl_in_seconds=0)
+    cache.set('other', 2, ttl_in_seconds=-5)
+
+    assert cache.stats()['size'] == 0
+
+def test_the_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(max_size=2, ttl_in_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+def test_invalidate_clear_and_stats(clock):
+    cache = TTLCache(max_size=10, ttl_in_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    cache.invalidate('a')
+    cache.invalidate('missing')
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'size': 1}
+
+    cache.clear()
+    assert cache.get('b') is None
+    assert cache.stats()['size'] == 0
@@ -0,0 +1,129 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
+import services.webhook as webhook_service
+from enums.order_status_enum import EnumOrderStatus
+from models.order import Order
+from models.ordered_product import OrderedProduct
+from repositories.financial_line import FinancialLineRepository
+from repositories.order import OrderRepository
+from repositories.processed_stripe_event import ProcessedStripeEventRepository
+from repositories.product import ProductRepository
+from services.webhook import WebhookService
+
+DELIVERIES = 20
+
+class FakeDatabase:
+    """Transactions over the order, the processed events and the financial lines.
+
+    Writes are buffered in their transaction and applied on commit. Like Mongo, a unique key that is
+    committed raises DuplicateKeyError, and a document written by another open transaction raises a
+    write conflict labelled TransientTransactionError.
+    """
+    def __init__(self, order_status:str):
+        self.lock = threading.Lock()
+        self.order_status = order_status
+        self.processed_events: set[str] = set()
+        self.paid_orders = 0
+        self.financial_line_inserts = 0
+        self.duplicates = 0
+        self.write_conflicts = 0
+        # Document -> transaction that wrote it and is not committed yet
+        self.pending: dict[str, object] = {}
+
+    def write(self, document:str, session):
+        owner = self.pending.setdefault(document, session)
+        if owner is not session:
+            self.write_conflicts += 1
+            raise OperationFailure('WriteConflict', code=112, details={'errorLabels': ['TransientTransactionError']})
+
+    def insert_event(self, event:object, session):
+        with self.lock:
+            if event.event_id in self.processed_events:
+                self.duplicates += 1
+                raise DuplicateKeyError('E11000 duplicate key error collection: processed_stripe_event')
+            self.write(f'event:{event.event_id}', session)
+            session.writes.append(lambda: self.processed_events.add(event.event_id))
+
+    def update_order(self, filter, update, session=None):
+        with self.lock:
+            if self.order_status not in filter["status"]["$in"]:
+                return SimpleNamespace(modified_count=0)
+            self.write('order', session)
+            session.writes.append(lambda: self.pay_order(update["$set"]["status"]))
+            return SimpleNamespace(modified_count=1)
+
+    def pay_order(self, status:str):
+        self.order_status = status
+        self.paid_orders += 1
+
+    def insert_financial_lines(self, lines:list, session):
+        session.writes.append(self.count_financial_lines)
+        return lines
+
+    def count_financial_lines(self):
+        self.financial_line_inserts += 1
+
+    def run_in_transaction_sync(self, callback):
+        session = SimpleNamespace(writes=[])
+        try:
+            result = callback(session)
+            # Leaves time for the other deliveries to reach the same documents
+            time.sleep(0.002)
+        except Exception:
+            with self.lock:
+                self.release(session)
+            raise
+
+        with self.lock:
+            for write in session.writes:
+                write()
+            self.release(session)
+        return result
+
+    def release(self, session):
+        self.pending = {document: owner for document, owner in self.pending.items() if owner is not session}
+
+def test_a_checkout_event_delivered_many_times_in_parallel_pays_the_order_once(monkeypatch):
+    product_id, seller_id = ObjectId(), ObjectId()
+    # Every delivery reads the order before any of them paid it
+    order = Order(
+        id=ObjectId(),
+        client=ObjectId(),
+        products=[OrderedProduct(product=product_id, price_at_order=10.0, quantity=2)],
+        total=20.0,
+        status=EnumOrderStatus.PENDING.value
+    )
+    database = FakeDatabase(EnumOrderStatus.PENDING.value)
+
+    monkeypatch.setattr(webhook_service, 'Order', SimpleNamespace(objects=lambda **filters: SimpleNamespace(first=lambda: order)))
+    monkeypatch.setattr(webhook_service, 'run_in_transaction_sync', database.run_in_transaction_sync)
+    monkeypatch.setattr(ProductRepository, 'find_sellers', lambda product_ids: {product_id: seller_id})
+    monkeypatch.setattr(ProcessedStripeEventRepository, 'insert_with_session', database.insert_event)
+    monkeypatch.setattr(OrderRepository, 'collection', lambda: SimpleNamespace(update_one=database.update_order))
+    monkeypatch.setattr(FinancialLineRepository, 'insert_many_with_session', database.insert_financial_lines)
+
+    start = threading.Barrier(DELIVERIES)
+
+    def deliver():
+        start.wait()
+        # A write conflict fails the event, the consumer delivers it again
+        while True:
+            try:
+                return WebhookService.checkout_success('evt_1', str(order.pk), 'pi_1')
+            except OperationFailure as exc:
+                assert exc.has_error_label('TransientTransactionError')
+
+    with ThreadPoolExecutor(max_workers=DELIVERIES) as executor:
+        for delivery in [executor.submit(deliver) for _ in range(DELIVERIES)]:
+            delivery.result()
+
+    assert database.processed_events == {'evt_1'}
+    assert database.order_status == EnumOrderStatus.PAID.value
+    assert database.paid_orders == 1
+    assert database.financial_line_inserts == 1
+    # Every other delivery ended on the unique index of the processed events
+    assert database.duplicates == DELIVERIES - 1